@@ -0,0 +1,133 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models.functions import Trunc
+from rest_framework import exceptions
+
+from EasyAPI.filters import DATE_FIELDS, NUM_FIELDS
+from EasyAPI.permissions import narrows_default_queryset
+
+AGGREGATES = {
+    "sum": models.Sum,
+    "avg": models.Avg,
+    "count": models.Count,
+    "min": models.Min,
+    "max": models.Max,
+}
+NUMERIC_AGGREGATES = ["sum", "avg"]
+DATE_KINDS = ["year", "quarter", "month", "week", "day"]
+DATETIME_KINDS = DATE_KINDS + ["hour"]
+
+
+def resolve_path(resource, path, relations=None):
+    """
+    The model field at the end of a "__" separated path, where every step is
+    a readable field of the resource registered for the model it's on. The
+    relations it crosses are added to relations as {path prefix: resource}.
+    """
+    if path == "pk":
+        return resource.model._meta.pk
+
+    field = None
+    names = path.split("__")
+    for i, name in enumerate(names):
+        if (
+            resource is None
+            or name not in resource.fields
+            or name in resource.write_only
+        ):
+            raise exceptions.ValidationError("Can't aggregate on %s" % path)
+        try:
+            field = resource.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise exceptions.ValidationError("Can't aggregate on %s" % path)
+        if i < len(names) - 1:
+            if not field.is_relation or field.many_to_many or field.one_to_many:
+                raise exceptions.ValidationError("Can't aggregate on %s" % path)
+            resource = resource.api.get_resource_for_model(field.related_model)
+            if relations is not None and resource is not None:
+                relations["__".join(names[: i + 1])] = resource
+
+    if not field.concrete or field.many_to_many:
+        raise exceptions.ValidationError("Can't aggregate on %s" % path)
+    return field
+
+
+def parse_group_by(resource, specs, relations=None):
+    """
+    Parse group_by specs, "path" or "path:kind" to truncate a date field to
+    one of DATE_KINDS, into (values() names, {alias: Trunc}).
+    """
+    names, buckets = [], {}
+    for spec in specs:
+        path, _, kind = spec.partition(":")
+        field = resolve_path(resource, path, relations)
+        if not kind:
+            names.append(path)
+            continue
+
+        kinds = (
+            isinstance(field, models.DateTimeField) and DATETIME_KINDS or DATE_KINDS
+        )
+        if not isinstance(field, DATE_FIELDS) or kind not in kinds:
+            raise exceptions.ValidationError(
+                "%s can't be grouped by %s" % (path, kind)
+            )
+        buckets["%s_%s" % (path, kind)] = Trunc(path, kind)
+    return names, buckets
+
+
+def parse_aggregates(resource, specs, relations=None):
+    # "func:path" into {"func_path": Func(path)}, and a bare "count" counts rows
+    aggregates = {}
+    for spec in specs:
+        func, _, path = spec.partition(":")
+        if func not in AGGREGATES:
+            raise exceptions.ValidationError("Unknown aggregate %s" % func)
+        path = path or (func == "count" and "pk" or "")
+        field = resolve_path(resource, path, relations)
+        if func in NUMERIC_AGGREGATES and not isinstance(field, NUM_FIELDS):
+            raise exceptions.ValidationError("Can't %s %s" % (func, path))
+
+        alias = path == "pk" and func or "%s_%s" % (func, path)
+        aggregates[alias] = AGGREGATES[func](path)
+    return aggregates
+
+
+def scope_relations(queryset, relations, user=None):
+    """
+    Narrows queryset to rows whose related objects along relations are in
+    their resource's permitted list queryset, so a group or aggregate never
+    reads values from rows the user couldn't list themselves.
+    """
+    for prefix, related in relations.items():
+        permission, audit = related.get_action_permission("list", user=user)
+        if permission is True and not narrows_default_queryset(related):
+            continue
+        permitted, audit = related.get_permitted_queryset("list", user=user)
+        queryset = queryset.filter(
+            models.Q(**{"%s__isnull" % prefix: True})
+            | models.Q(**{"%s__in" % prefix: permitted.values("pk")})
+        )
+    return queryset
+
+
+def aggregate(resource, queryset, group_by=(), aggregates=(), user=None):
+    """
+    Group queryset by the group_by specs and compute the aggregate specs for
+    every group in one query, or over the whole queryset without group_by.
+    """
+    relations = {}
+    names, buckets = parse_group_by(resource, group_by, relations)
+    annotations = parse_aggregates(resource, aggregates or ["count"], relations)
+    clashes = set(annotations) & (set(names) | set(buckets))
+    if clashes:
+        raise exceptions.ValidationError("Ambiguous names %s" % sorted(clashes))
+
+    queryset = scope_relations(queryset, relations, user=user).order_by()
+    if not names and not buckets:
+        return [queryset.aggregate(**annotations)]
+
+    keys = names + list(buckets)
+    return list(
+        queryset.values(*names, **buckets).annotate(**annotations).order_by(*keys)
+    )
@@ -2,6 +2,7 @@ from weakref import WeakSet
 
 import graphene, json
 from django.apps import apps
+from django.conf import settings
 from django.conf.urls import url
 from django.contrib import admin
 from django.contrib.auth.mixins import AccessMixin
@@ -9,9 +10,16 @@ from django.db.models.base import ModelBase
 from django.db.models import QuerySet, Model
 from django.views.decorators.csrf import csrf_exempt
 from graphene_django.types import DjangoObjectType
+from graphene_django.settings import graphene_settings
 from graphene_django.views import GraphQLView
+from graphql.error import GraphQLError, GraphQLSyntaxError
+from graphql.execution import ExecutionResult
 from rest_framework import permissions
 
+from EasyAPI.limits import QueryAnalysis, QueryLimitExceeded
+from EasyAPI.persisted import DocumentCache, PersistedQueries, PersistedQueryError
+from EasyAPI.scope import request_scope
+
 all_apis = WeakSet()
 actions = ["create", "edit", "retrieve", "list", "delete"]
 
@@ -53,10 +61,20 @@ class EasyAPI(object):
         graphql=True,
         admin=False,
         permission_context="*",
+        pagination_class=None,
+        compiled=False,
         dump_info=False,
+        graphql_max_depth=None,
+        graphql_max_nodes=None,
+        graphql_max_cost=None,
+        graphql_document_cache_size=None,
+        persisted_queries_alias=None,
+        persisted_queries_file=None,
     ):
         self.name = name
         self._registry = {}
+        self.search_backends = []
+        all_apis.add(self)
         self.description = (
             description
             if description is not None
@@ -68,6 +86,30 @@ class EasyAPI(object):
         self.admin = admin
         self.dump_info = dump_info
         self.permission_context = permission_context
+        self.pagination_class = pagination_class
+        self.compiled = compiled
+        # Checked against every GraphQL operation before it runs
+        self.graphql_max_depth = graphql_max_depth or getattr(
+            settings, "EASY_API_GRAPHQL_MAX_DEPTH", 10
+        )
+        self.graphql_max_nodes = graphql_max_nodes or getattr(
+            settings, "EASY_API_GRAPHQL_MAX_NODES", 500
+        )
+        self.graphql_max_cost = graphql_max_cost or getattr(
+            settings, "EASY_API_GRAPHQL_MAX_COST", 50000
+        )
+        self.graphql_documents = DocumentCache(
+            graphql_document_cache_size
+            or getattr(settings, "EASY_API_GRAPHQL_DOCUMENT_CACHE_SIZE", 500)
+        )
+        self.persisted_queries = PersistedQueries(
+            name,
+            persisted_queries_alias
+            or getattr(settings, "EASY_API_PERSISTED_QUERIES_CACHE", "default"),
+        )
+        self.persisted_queries_file = persisted_queries_file or getattr(
+            settings, "EASY_API_PERSISTED_QUERIES_FILE", None
+        )
         self._registry.update(self._registry)
 
     def __str__(self):
@@ -102,6 +144,12 @@ class EasyAPI(object):
             )
 
         self._registry[model] = api
+        # Relation chains of earlier resources may run through this one
+        for resource in self._registry.values():
+            resource.precompute_permissions()
+
+        if self.compiled or api.compiled:
+            api.compile()
 
         for name in api.inlines:
             inline = api.get_inline_model(name)
@@ -140,10 +188,11 @@ class EasyAPI(object):
         return data
 
     def get_urls(self):
-        from rest_framework.routers import APIRootView, DefaultRouter
+        from rest_framework.routers import APIRootView
         from EasyAPI.metadata import EasyAPIMetadata
+        from EasyAPI.routers import EasyRouter
 
-        router = DefaultRouter()
+        router = EasyRouter()
 
         class EasyAPIRootView(APIRootView):
             metadata_class = EasyAPIMetadata
@@ -193,9 +242,13 @@ class EasyAPI(object):
             class Mutate(*mutations, graphene.ObjectType):
                 pass
 
+            api = self
+
             class PermissionedGraphQL(AccessMixin, GraphQLView):
                 permission_classes = self.permissions
                 raise_exception = True
+                analysis = None
+                persisted_error = None
 
                 def dispatch(self, request, *args, **kwargs):
                     from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -208,14 +261,81 @@ class EasyAPI(object):
                         permission = permission_class()
                         if not permission.has_permission(request, self):
                             return self.handle_no_permission()
-                    return super().dispatch(request, *args, **kwargs)
+                    with request_scope():
+                        return super().dispatch(request, *args, **kwargs)
+
+                def get_graphql_params(self, request, data):
+                    query, variables, operation_name, id = super().get_graphql_params(
+                        request, data
+                    )
+                    extensions = request.GET.get("extensions") or data.get("extensions")
+                    try:
+                        query = api.persisted_queries.resolve(query, extensions)
+                    except PersistedQueryError as e:
+                        self.persisted_error = e
+                    return query, variables, operation_name, id
+
+                def execute_graphql_request(
+                    self, request, data, query, variables, operation_name, *args
+                ):
+                    if self.persisted_error is not None:
+                        # Clients retry with the query when it isn't found
+                        return ExecutionResult(
+                            errors=[self.persisted_error],
+                            invalid=self.persisted_error.extensions["code"]
+                            != "PERSISTED_QUERY_NOT_FOUND",
+                        )
+
+                    # Parsed documents are measured and limited before they run
+                    if query:
+                        try:
+                            document = self.get_backend(request).document_from_string(
+                                self.schema, query
+                            )
+                            self.analysis = QueryAnalysis(
+                                self.schema,
+                                document.document_ast,
+                                operation_name,
+                                variables,
+                                graphene_settings.RELAY_CONNECTION_MAX_LIMIT,
+                            )
+                            self.analysis.check(
+                                api.graphql_max_depth,
+                                api.graphql_max_nodes,
+                                api.graphql_max_cost,
+                            )
+                        except GraphQLSyntaxError:
+                            # Parse errors are reported by the normal path
+                            self.analysis = None
+                        except QueryLimitExceeded as e:
+                            return ExecutionResult(errors=[e], invalid=True)
+                        except Exception:
+                            # A query that can't be measured isn't run unlimited
+                            return ExecutionResult(
+                                errors=[
+                                    GraphQLError("Query could not be analysed")
+                                ],
+                                invalid=True,
+                            )
+                    return super().execute_graphql_request(
+                        request, data, query, variables, operation_name, *args
+                    )
+
+                def json_encode(self, request, d, pretty=False):
+                    if self.analysis is not None:
+                        d = dict(d, extensions={"cost": self.analysis.as_dict()})
+                    return super().json_encode(request, d, pretty=pretty)
 
             schema = graphene.Schema(query=Query, mutation=mutations and Mutate or None)
+            if self.persisted_queries_file:
+                self.persisted_queries.warm(self.persisted_queries_file)
 
         urlpatterns = router.urls + (self.graphql and [
             url(
                 r"^graphql$",
-                csrf_exempt(PermissionedGraphQL.as_view(graphiql=True, schema=schema)),
+                csrf_exempt(PermissionedGraphQL.as_view(
+                    graphiql=True, schema=schema, backend=self.graphql_documents
+                )),
             ),
         ] or []) 
         return urlpatterns
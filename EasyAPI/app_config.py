@@ -1,5 +1,6 @@
 from django.apps import AppConfig
 from django.core import checks
+from django.db.models.signals import post_migrate
 
 
 class EasyAPIConfig(AppConfig):
@@ -9,7 +10,9 @@ class EasyAPIConfig(AppConfig):
 
     def ready(self):
         from EasyAPI.api import EasyAPI, check_dependencies
+        from EasyAPI.search import create_search_indexes
 
         checks.register(check_dependencies, checks.Tags.models)
         self.module.autodiscover()
+        post_migrate.connect(create_search_indexes, dispatch_uid="easyapi-search")
         super().ready()
@@ -0,0 +1,140 @@
+import hashlib
+import uuid
+
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import HttpResponse
+
+# {model label: set of cache aliases holding responses that depend on it}
+tracked_models = {}
+
+
+def generation_key(model):
+    return "easyapi:generation:%s" % model._meta.label_lower
+
+
+def invalidate_model(model, **kwargs):
+    """
+    Give the model a new generation in every cache that tracks it, so any
+    cached response built from it stops matching. Anything that writes
+    without sending signals (queryset.update() and friends) should call this.
+    Generations are random rather than counted, so one that was evicted and
+    started again can't come back to an old value.
+    """
+    for alias in tracked_models.get(model._meta.label_lower, ()):
+        caches[alias].set(generation_key(model), uuid.uuid4().hex, None)
+
+
+def on_save_or_delete(sender, **kwargs):
+    invalidate_model(sender)
+
+
+def on_m2m_changed(sender, instance, model, **kwargs):
+    invalidate_model(type(instance))
+    invalidate_model(model)
+
+
+def track_model(model, alias):
+    label = model._meta.label_lower
+    if label not in tracked_models:
+        tracked_models[label] = set()
+        uid = "easyapi-cache-%s" % label
+        post_save.connect(on_save_or_delete, sender=model, dispatch_uid=uid)
+        post_delete.connect(on_save_or_delete, sender=model, dispatch_uid=uid)
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(
+                on_m2m_changed,
+                sender=field.remote_field.through,
+                dispatch_uid="%s-%s" % (uid, field.name),
+            )
+    tracked_models[label].add(alias)
+
+
+class ResponseCache(object):
+    """
+    Caches rendered list and retrieve responses for a resource in one of
+    Django's caches. Keys include the generations of the resource's model and
+    of every model reachable through its relations, many_to_many and inlines,
+    and those generations are bumped by post_save, post_delete and
+    m2m_changed, so writes invalidate without having to find stale keys.
+    """
+
+    def __init__(self, resource, alias="default", timeout=300):
+        self.resource = resource
+        self.alias = alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+        self.models = [resource.model] + [
+            resource.get_inline_model(name)
+            for name in resource.relations + resource.many_to_many + resource.inlines
+        ]
+        self.models = [m for m in dict.fromkeys(self.models) if m is not None]
+        for model in self.models:
+            track_model(model, alias)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def stats(self):
+        return {"alias": self.alias, "hits": self.hits, "misses": self.misses}
+
+    def get_scope(self, action, user):
+        # Responses are shared between users only when the permission didn't
+        # depend on who asked
+        permission, audit = self.resource.get_action_permission(action, user=user)
+        if permission is True:
+            return "*"
+        return "user:%s" % (user and user.pk)
+
+    def get_generations(self):
+        keys = [generation_key(m) for m in self.models]
+        generations = self.cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                # Never set or evicted, so it starts as a new generation
+                self.cache.add(key, uuid.uuid4().hex, None)
+                generations[key] = self.cache.get(key)
+        return [generations[key] for key in keys]
+
+    def get_key(self, request, action, user, lookup=None):
+        context = self.resource.get_permission_context()
+        parts = [
+            self.resource.api.name,
+            self.resource.label,
+            action,
+            callable(context) and "callable" or context,
+            self.get_scope(action, user),
+            sorted((lookup or {}).items()),
+            sorted(request.query_params.lists()),
+            request.META.get("HTTP_ACCEPT", ""),
+            self.get_generations(),
+        ]
+        digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+        return "easyapi:response:%s" % digest
+
+    def get(self, key):
+        cached = self.cache.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        content, content_type, headers = cached
+        response = HttpResponse(content, content_type=content_type)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def set(self, key, response, headers=("Count", "ETag", "Last-Modified")):
+        self.cache.set(
+            key,
+            (
+                response.content,
+                response["Content-Type"],
+                {name: response[name] for name in headers if response.has_header(name)},
+            ),
+            self.timeout,
+        )
@@ -0,0 +1,208 @@
+import collections
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import fields as drf_fields, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import (
+    HyperlinkedRelatedField,
+    ManyRelatedField,
+    PKOnlyObject,
+    PrimaryKeyRelatedField,
+)
+
+# Fields whose to_representation returns a database value of the matching
+# column type unchanged, so generated code can skip calling them
+PASSTHROUGH = (
+    drf_fields.ReadOnlyField,
+    drf_fields.CharField,
+    drf_fields.IntegerField,
+    drf_fields.BooleanField,
+)
+
+# Fields rendered from the serializer's context (the request), which the
+# converters bound at compile time don't have
+CONTEXTUAL = (drf_fields.FileField,)
+
+# How a readable field is produced:
+#   "column" a local column (or FK id) read straight off the object or row
+#   "many"   a to-many relation rendered through its child field
+#   "field"  anything else, left to the serializer's bound DRF field
+Step = collections.namedtuple("Step", ["name", "kind", "column", "convert"])
+
+
+def plan_field(name, field, model):
+    fallback = Step(name, "field", None, None)
+    if field.source == "*" or len(field.source_attrs) != 1:
+        return fallback
+    attr = field.source_attrs[0]
+
+    try:
+        model_field = (
+            model._meta.pk if attr == "pk" else model._meta.get_field(attr)
+        )
+    except FieldDoesNotExist:
+        return fallback
+
+    if isinstance(field, ManyRelatedField):
+        child = field.child_relation
+        if not model_field.is_relation or isinstance(child, HyperlinkedRelatedField):
+            return fallback
+        return Step(name, "many", attr, child.to_representation)
+
+    if not model_field.concrete or model_field.many_to_many:
+        return fallback
+
+    if model_field.is_relation:
+        if not isinstance(field, PrimaryKeyRelatedField) or field.pk_field:
+            return fallback
+        column = "pk" if attr == "pk" else model_field.attname
+        return Step(name, "column", column, None)
+
+    if isinstance(field, serializers.BaseSerializer):
+        return fallback
+    # values() rows hold a file's name rather than its FieldFile, and fields
+    # from outside DRF may read the context too
+    if (
+        isinstance(field, CONTEXTUAL)
+        or isinstance(model_field, models.FileField)
+        or not type(field).to_representation.__module__.startswith("rest_framework.")
+    ):
+        return fallback
+    convert = None if type(field) in PASSTHROUGH else field.to_representation
+    return Step(name, "column", attr, convert)
+
+
+def plan_serializer(serializer_class, model):
+    return [
+        plan_field(name, field, model)
+        for name, field in serializer_class().fields.items()
+        if not field.write_only
+    ]
+
+
+def render_field(field, instance, data):
+    # The per-field body of Serializer.to_representation
+    try:
+        attribute = field.get_attribute(instance)
+    except SkipField:
+        return
+    check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+    data[field.field_name] = (
+        None if check_for_none is None else field.to_representation(attribute)
+    )
+
+
+def generate(function_name, steps, accessor):
+    """
+    Writes out a flat function for steps, one statement per field, with the
+    converters bound as globals so nothing is resolved per call.
+    """
+    namespace = {"render_field": render_field}
+    lines = ["def %s(source, fields=None):" % function_name, "    data = {}"]
+
+    for i, step in enumerate(steps):
+        key = repr(step.name)
+        convert = "convert_%s" % i
+        namespace[convert] = step.convert
+
+        if step.kind == "column":
+            lines.append("    value = %s" % accessor(step.column))
+            if step.convert is None:
+                lines.append("    data[%s] = value" % key)
+            else:
+                lines.append(
+                    "    data[%s] = None if value is None else %s(value)"
+                    % (key, convert)
+                )
+        elif step.kind == "many":
+            lines.append(
+                "    data[%s] = [%s(item) for item in source.%s.all()]"
+                " if source.pk is not None else []" % (key, convert, step.column)
+            )
+        else:
+            lines.append("    render_field(fields[%s], source, data)" % key)
+
+    lines.append("    return data")
+    source = "\n".join(lines)
+    exec(compile(source, "<EasyAPI %s>" % function_name, "exec"), namespace)
+    function = namespace[function_name]
+    function.source = source
+    return function
+
+
+def compile_serializer_function(serializer_class, model):
+    """
+    A function(instance, fields) producing serializer_class's output for one
+    instance from plain attribute reads and converters. Only fields it can't
+    flatten, or that render from the serializer's context, go through the
+    serializer's bound fields.
+    """
+    return generate(
+        "serialize_%s" % model._meta.model_name,
+        plan_serializer(serializer_class, model),
+        lambda column: "source.%s" % column,
+    )
+
+
+def compile_serializer_class(serializer_class, model):
+    # Output goes through the generated function, while validation and saving
+    # are still the serializer's own. A custom to_representation is kept.
+    to_representation = serializer_class.to_representation
+    if to_representation is not serializers.Serializer.to_representation:
+        return serializer_class
+
+    function = compile_serializer_function(serializer_class, model)
+
+    def to_representation(self, instance):
+        return function(instance, self.fields)
+
+    return type(
+        "Compiled%s" % serializer_class.__name__,
+        (serializer_class,),
+        {
+            "to_representation": to_representation,
+            "compiled_from": serializer_class,
+            "compiled_function": staticmethod(function),
+        },
+    )
+
+
+class RowConverter(object):
+    """
+    Turns rows from queryset.values(*converter.columns) into the same dicts the
+    serializer would produce from model instances, without building either.
+    """
+
+    def __init__(self, steps, function):
+        self.columns = [step.column for step in steps]
+        self.function = function
+
+    def __call__(self, row):
+        return self.function(row)
+
+    def convert_all(self, rows):
+        function = self.function
+        return [function(row) for row in rows]
+
+
+def compile_row_converter(serializer_class, model):
+    """
+    Returns a RowConverter for serializer_class, or None when any readable
+    field is more than a plain column or a FK rendered as its pk.
+    """
+    serializer_class = getattr(serializer_class, "compiled_from", serializer_class)
+    to_representation = serializer_class.to_representation
+    if to_representation is not serializers.Serializer.to_representation:
+        return None
+
+    steps = plan_serializer(serializer_class, model)
+    if any(step.kind != "column" for step in steps):
+        return None
+
+    function = generate(
+        "convert_%s_row" % model._meta.model_name,
+        steps,
+        lambda column: "source[%r]" % column,
+    )
+    return RowConverter(steps, function)
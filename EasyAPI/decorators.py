@@ -1,12 +1,23 @@
-def APIProperty(gql_type):
+def APIProperty(gql_type, select_related=None, prefetch_related=None, only=None):
+    # The hints name what the property reads, so querysets listing it can load
+    # that up front. only=None means it may read any column.
     def APIPropertyWrapper(func):
         setattr(func, "_APIProperty", True)
         setattr(func, "_APIType", gql_type)
+        setattr(
+            func,
+            "_APIHints",
+            {
+                "select_related": list(select_related or []),
+                "prefetch_related": list(prefetch_related or []),
+                "only": None if only is None else list(only),
+            },
+        )
         return func
 
     return APIPropertyWrapper
 
-def APIAction(detail=None, many=None, read_only=False):
+def APIAction(detail=None, many=None, read_only=False, background=False):
     if detail and many or (not detail and not many):
         raise Exception("Must use either detail=true or many=true on %s" % func)
     detail = not many
@@ -19,6 +30,7 @@ def APIAction(detail=None, many=None, read_only=False):
                 "detail": detail,
                 "many": many,
                 "read_only": read_only,
+                "background": background,
             },
         )
         return func
@@ -1,7 +1,11 @@
+import collections
+import copy
+
 import django_filters
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.db import models
 from django.db.models.fields import reverse_related
+from django_filters.constants import EMPTY_VALUES
 
 UNSUPPORTED = (GenericForeignKey,)
 TEXT_FIELDS = (models.CharField, models.TextField)
@@ -27,30 +31,83 @@ def map_filter_fields(resource, fields):
             filter_fields[name] = ["exact", "icontains", "istartswith", "iendswith"]
             contains = name + "_icontains"
             filters[contains] = django_filters.CharFilter(
-                field_name=name, lookup_expr=contains
+                field_name=name, lookup_expr="icontains"
             )
 
         if isinstance(f, NUM_FIELDS):
             filter_fields[name] = ["exact", "gt", "lt", "gte", "lte"]
             lt = name + "_less_than"
-            filters[lt] = django_filters.NumberFilter(field_name=name, lookup_expr=lt)
+            filters[lt] = django_filters.NumberFilter(field_name=name, lookup_expr="lt")
             gt = name + "_greater_than"
-            filters[gt] = django_filters.NumberFilter(field_name=name, lookup_expr=gt)
+            filters[gt] = django_filters.NumberFilter(field_name=name, lookup_expr="gt")
 
         if isinstance(f, DATE_FIELDS):
             filter_fields[name] = ["exact", "gt", "lt", "gte", "lte", "range"]
             lt = name + "_less_than"
-            filters[lt] = django_filters.DateTimeFilter(field_name=name, lookup_expr=lt)
+            filters[lt] = django_filters.DateTimeFilter(field_name=name, lookup_expr="lt")
 
             gt = f.name + "_greater_than"
-            filters[gt] = django_filters.DateTimeFilter(field_name=name, lookup_expr=gt)
+            filters[gt] = django_filters.DateTimeFilter(field_name=name, lookup_expr="gt")
 
             rng = name + "_range"
             filters[rng] = django_filters.DateRangeFilter(field_name=name)
 
-
     return filter_fields, filters
 
+class CompiledFilters(collections.OrderedDict):
+    """
+    base_filters for an assembled FilterSet. Filters only hold configuration,
+    so the deepcopy FilterSet makes of them for each request can be a shallow
+    copy of each filter instead. extra and the form field are per request,
+    e.g. QuerySetRequestMixin writes the request's queryset into extra.
+    """
+
+    def __deepcopy__(self, memo):
+        filters = collections.OrderedDict()
+        for name, _filter in self.items():
+            filters[name] = copy.copy(_filter)
+            filters[name].extra = dict(_filter.extra)
+            filters[name].__dict__.pop("_field", None)
+        return filters
+
+
+class RelatedFilter(django_filters.Filter):
+    """
+    Applies a filter of a related resource as a single subquery against that
+    resource's permitted queryset, so it can't reveal rows the user can't
+    list. Matching by IN (subquery) never repeats a row the way a JOIN across
+    a reverse relation would, so no distinct() is needed.
+    """
+
+    def __init__(self, relation, resource, subfilter, **kwargs):
+        kwargs.setdefault("label", subfilter.label)
+        super(RelatedFilter, self).__init__(field_name=relation.name, **kwargs)
+        self.relation = relation
+        self.resource = resource
+        self.subfilter = subfilter
+
+    @property
+    def field(self):
+        return self.subfilter.field
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        request = getattr(self.parent, "request", None)
+        user = request and request.user.is_authenticated and request.user or None
+        related, audit = self.resource.get_permitted_queryset("list", user=user)
+        related = self.subfilter.filter(related, value)
+
+        if self.relation.concrete:
+            # Forward relation, match our FK column against their pks
+            return qs.filter(
+                **{"%s__in" % self.relation.attname: related.values("pk")}
+            )
+        # Reverse relation, match our pk against their FK column
+        return qs.filter(pk__in=related.values(self.relation.field.attname))
+
+
 def create_filter(resource, _filter, options):
     return getattr(resource.model, options.get('name', _filter))
 
@@ -64,59 +121,74 @@ class EasyFilters(object):
             and isinstance(resource.model_fields_simple[f], SUPPORTED)
         ]
 
+        # Everything is worked out once here and declared on the class, so
+        # building a FilterSet per request only copies the filters and reuses
+        # one form class
+        _fields, _filters = map_filter_fields(resource, the_fields)
+        declared = dict(_filters)
+        for _filter, options in resource.filters.items():
+            declared[_filter] = create_filter(resource, _filter, options)
+
         class GenericBaseFilters(django_filters.FilterSet):
-            filter_fields = {}
-            local_filter_fields = {}
+            filter_fields = dict(**_fields)
+            local_filter_fields = _fields
             sub_filter_fields = {}
-            local_filters = {}
+            local_filters = _filters
             sub_filters = {}
 
-            def __init__(self, *args, **kwargs):
-                super(GenericBaseFilters, self).__init__(*args, **kwargs)
-                _fields, _filters = map_filter_fields(resource, the_fields)
-                self.resource = resource
-                self.local_filter_fields = _fields
-                self.filter_fields = dict(**_fields)
-                self.local_filters = _filters
-                self.filters.update(_filters)
-
-                for _filter, options in resource.filters.items():
-                    self.filters[_filter] = create_filter(resource, _filter, options)
-        
-
             class Meta:
                 model = resource.model
                 fields = the_fields
 
+            def get_form_class(self):
+                # The form only depends on the filters, unless one of them
+                # picks its queryset per request
+                cls = type(self)
+                if any(
+                    isinstance(f, django_filters.filters.QuerySetRequestMixin)
+                    for f in self.filters.values()
+                ):
+                    return super(GenericBaseFilters, self).get_form_class()
+                if "form_class" not in cls.__dict__:
+                    cls.form_class = super(GenericBaseFilters, self).get_form_class()
+                return cls.form_class
+
             def add_subfilters(self):
-                return
-                for relation in self.resource.reverse_relations:
-                    if relation not in self.resource.fields:
-                        continue
-                    model = self.resource.get_inline_model(relation)
-                    registered = self.resource.api._registry.get(model, None)
-                    if not registered:
-                        continue
-                    subfilterset = registered.filterset
-                    for name, _filter in subfilterset.local_filters.items():
-                        self.sub_filters["%s__%s" % (relation, name)] = _filter
-                    for name, fields in subfilterset.local_filter_fields.items():
-                        self.sub_filter_fields["%s__%s" % (relation, name)] = fields
-
-                for relation in self.resource.relations:
-                    if relation not in self.resource.fields:
+                """
+                Add "<relation>__<filter>" for the filters of the resources
+                registered for this resource's forward and reverse relations.
+                Called once every resource in the API is registered.
+                """
+                cls = type(self)
+                relations = self.resource.relations + self.resource.reverse_relations
+                for relation in relations:
+                    field = self.resource.model_fields[relation]
+                    if relation not in self.resource.fields or field.many_to_many:
                         continue
-                    fk = self.resource.model_fields[relation]
-                    registered = self.resource.api._registry.get(fk.related_model, None)
+                    registered = self.resource.api.get_resource_for_model(
+                        field.related_model
+                    )
                     if not registered:
                         continue
-                    subfilterset = registered.filterset
-                    for name, _filter in subfilterset.local_filters.items():
-                        self.sub_filters["%s__%s" % (relation, name)] = _filter
-                    for name, fields in subfilterset.local_filter_fields.items():
-                        self.sub_filter_fields["%s__%s" % (relation, name)] = fields
-
-                self.filter_fields.update(self.sub_filter_fields)
-                self.filters.update(self.sub_filters)
 
-        return GenericBaseFilters
+                    subfilters = registered.filterset_class.base_filters
+                    for name, _filter in subfilters.items():
+                        if isinstance(_filter, RelatedFilter):
+                            continue
+                        self.sub_filters["%s__%s" % (relation, name)] = RelatedFilter(
+                            field, registered, _filter
+                        )
+                    local_fields = registered.filterset.local_filter_fields
+                    for name, lookups in local_fields.items():
+                        self.sub_filter_fields["%s__%s" % (relation, name)] = lookups
+
+                cls.base_filters.update(self.sub_filters)
+                if "form_class" in cls.__dict__:
+                    del cls.form_class
+
+        GenericBaseFilters.resource = resource
+        filterset_class = type(
+            GenericBaseFilters.__name__, (GenericBaseFilters,), declared
+        )
+        filterset_class.base_filters = CompiledFilters(filterset_class.base_filters)
+        return filterset_class
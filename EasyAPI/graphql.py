@@ -1,16 +1,119 @@
+from functools import partial
+
 import graphene
 from django_filters.rest_framework import DjangoFilterBackend
 from graphene_django import DjangoObjectType
+from graphene_django.fields import DjangoConnectionField
 from graphene_django.filter.fields import DjangoFilterConnectionField
+from graphene_django.registry import get_global_registry
 from graphene_django.rest_framework.mutation import SerializerMutation
 from rest_framework import status, viewsets
 from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 
+from EasyAPI.loaders import ObjectLoader, RelatedLoader, get_loader
 from EasyAPI.metadata import EasyAPIMetadata
+from EasyAPI.selections import get_node_selections, optimize_queryset, trusts_related
 from EasyAPI.serializers import classproperty
 
 
+def get_user(info):
+    return info.context.user.is_authenticated and info.context.user or None
+
+
+class BatchedConnectionMixin(object):
+    """
+    Resolves an inline's connection through a RelatedLoader, so the children
+    of every parent at one level of the query are fetched together. Filter
+    arguments are applied to the batched query, and pagination to each
+    parent's rows.
+    """
+
+    def __init__(self, _type, relation, related, *args, **kwargs):
+        super(BatchedConnectionMixin, self).__init__(_type, *args, **kwargs)
+        self.relation = relation
+        self.related = related
+
+    def resolve_batch(self, root, info, **args):
+        filtering_args = getattr(self, "filtering_args", {})
+        data = {k: v for k, v in args.items() if k in filtering_args}
+        # Unfiltered inlines may have been prefetched by the parent's queryset
+        accessor = self.relation.get_accessor_name()
+        if not data and accessor in getattr(root, "_prefetched_objects_cache", {}):
+            return list(getattr(root, accessor).all())
+
+        refine = data and (
+            lambda qs: self.filterset_class(
+                data=data, queryset=qs, request=info.context
+            ).qs
+        )
+        user = get_user(info)
+        field = self.relation.field
+        loader = get_loader(
+            (
+                "related",
+                self.related.api.name,
+                self.related.label,
+                field.name,
+                user and user.pk,
+                repr(sorted(data.items())),
+            ),
+            lambda: RelatedLoader(self.related, user, field, refine),
+        )
+        return loader.load(getattr(root, field.target_field.attname))
+
+    def get_resolver(self, parent_resolver):
+        return partial(
+            self.connection_resolver,
+            self.resolve_batch,
+            self.connection_type,
+            self.get_manager(),
+            lambda connection, iterable, info, args: iterable,
+            self.max_limit,
+            self.enforce_first_or_last,
+        )
+
+
+class BatchedConnectionField(BatchedConnectionMixin, DjangoConnectionField):
+    pass
+
+
+class BatchedFilterConnectionField(BatchedConnectionMixin, DjangoFilterConnectionField):
+    pass
+
+
+def get_batched_inline(relation, related):
+    # Mirrors graphene_django's converter for reverse relations
+    def dynamic_type():
+        _type = get_global_registry().get_type_for_model(relation.related_model)
+        if not _type:
+            return
+        field_class = (
+            _type._meta.filter_fields or _type._meta.filterset_class
+        ) and BatchedFilterConnectionField or BatchedConnectionField
+        return field_class(_type, relation, related, required=True)
+
+    return graphene.Dynamic(dynamic_type)
+
+
+def get_batched_resolver(field, related):
+    def resolve_related(obj, info):
+        key = getattr(obj, field.attname)
+        if key is None:
+            return None
+        user = get_user(info)
+        # Joined in by the parent's queryset
+        if field.is_cached(obj) and trusts_related(related, user):
+            return getattr(obj, field.name)
+        loader = get_loader(
+            ("object", related.api.name, related.label, user and user.pk),
+            lambda: ObjectLoader(related, user),
+        )
+        return loader.load(key)
+
+    return resolve_related
+
+
 def Assemble(resource):
     class ObjectMeta:
         model = resource.model
@@ -31,21 +134,37 @@ def Assemble(resource):
 
         resolvers[name] = _type(resolver=get_property(name))
 
+    # Relations to other resources of the api are loaded a level at a time
+    for name in resource.gql_fields:
+        field = resource.model_fields[name]
+        related = field.is_relation and resource.api.get_resource_for_model(
+            field.related_model
+        )
+        if not related:
+            continue
+        if field.many_to_one and field.concrete:
+            resolvers["resolve_%s" % name] = get_batched_resolver(field, related)
+        elif field.one_to_many:
+            resolvers[name] = get_batched_inline(field, related)
+
     @classmethod
     def get_queryset(cls, queryset, info):
-        qs, audit = resource.get_permitted_queryset(
-            "list",
-            user=(info.context.user.is_authenticated and info.context.user or None),
-            qs=queryset,
-        )
-        return qs
+        user = get_user(info)
+        qs, audit = resource.get_permitted_queryset("list", user=user, qs=queryset)
+        selections = get_node_selections(info, info.field_asts)
+        return optimize_queryset(resource, qs, info, selections, user)
 
     @classmethod
     def get_node(cls, info, id):
+        user = get_user(info)
+        selections = get_node_selections(info, info.field_asts)
         obj, audit = resource.get_permitted_object(
             id,
-            "detail",
-            user=(info.context.user.is_authenticated and info.context.user or None),
+            "retrieve",
+            user=user,
+            qs=optimize_queryset(
+                resource, resource.get_default_queryset(), info, selections, user
+            ),
         )
         return obj
 
@@ -61,7 +180,9 @@ def Assemble(resource):
     )
 
     class MutationMeta:
-        serializer_class = resource.serializer_class.Assemble(resource, "id")
+        serializer_class = getattr(
+            resource.serializer_class, "compiled_from", resource.serializer_class
+        ).Assemble(resource, "id")
         model = resource.model
         name = "%sMutation" % resource.model._meta.object_name
         fields = list(resource.gql_fields.keys())
@@ -0,0 +1,117 @@
+import collections
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = "EasyAPI.jobs.ThreadPoolBackend"
+
+
+class Job(object):
+    def __init__(self, action, user=None):
+        self.id = uuid.uuid4().hex
+        self.action = action
+        self.user_id = user and user.pk
+        self.status = "pending"
+        self.result = None
+        self.error = None
+
+    def run(self, func, *args, **kwargs):
+        self.status = "running"
+        try:
+            self.result = func(*args, **kwargs)
+            self.status = "done"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "action": self.action,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class BaseJobBackend(object):
+    """
+    Runs background APIActions. submit() must return a Job straight away and
+    get() must find it again by id, so a backend for a real task queue only
+    has to implement those two.
+    """
+
+    def submit(self, action, func, *args, user=None, **kwargs):
+        raise NotImplementedError
+
+    def get(self, job_id):
+        raise NotImplementedError
+
+
+class MemoryJobBackend(BaseJobBackend):
+    # Keeps the most recent max_jobs jobs in this process
+    max_jobs = 1000
+
+    def __init__(self):
+        self.jobs = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, job):
+        with self.lock:
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+
+class ImmediateBackend(MemoryJobBackend):
+    """
+    Runs jobs inside the request, which is handy for tests and debugging.
+    """
+
+    def submit(self, action, func, *args, user=None, **kwargs):
+        job = Job(action, user=user)
+        self.add(job)
+        job.run(func, *args, **kwargs)
+        return job
+
+
+class ThreadPoolBackend(MemoryJobBackend):
+    """
+    Runs jobs on a thread pool in the web process. Connections are per
+    thread, so each worker closes its own when a job is finished.
+    """
+
+    max_workers = 4
+
+    def __init__(self):
+        super(ThreadPoolBackend, self).__init__()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def work(self, job, func, *args, **kwargs):
+        try:
+            job.run(func, *args, **kwargs)
+        finally:
+            connections.close_all()
+
+    def submit(self, action, func, *args, user=None, **kwargs):
+        job = Job(action, user=user)
+        self.add(job)
+        self.executor.submit(self.work, job, func, *args, **kwargs)
+        return job
+
+
+backends = {}
+
+
+def get_job_backend():
+    path = getattr(settings, "EASY_API_JOB_BACKEND", DEFAULT_BACKEND)
+    if path not in backends:
+        backends[path] = import_string(path)()
+    return backends[path]
@@ -0,0 +1,150 @@
+from graphene_django import DjangoObjectType
+from graphql.error import GraphQLError
+from graphql.language import ast
+from graphql.type.definition import GraphQLList, get_named_type
+
+
+class QueryLimitExceeded(GraphQLError):
+    pass
+
+
+def is_connection(graphql_type):
+    fields = getattr(graphql_type, "fields", {})
+    return "edges" in fields and "pageInfo" in fields
+
+
+class QueryAnalysis(object):
+    """
+    Measures a parsed GraphQL operation before it runs:
+      depth  the deepest nesting of fields
+      nodes  how many fields are selected, with fragments expanded
+      cost   an estimate of the model objects it loads, multiplying each list
+             or connection by its first/last argument, or default_page_size
+             when it has neither
+    """
+
+    def __init__(
+        self,
+        schema,
+        document_ast,
+        operation_name=None,
+        variables=None,
+        default_page_size=100,
+    ):
+        self.schema = schema
+        self.variables = variables or {}
+        self.default_page_size = default_page_size
+        self.depth = 0
+        self.nodes = 0
+        self.cost = 0
+
+        self.fragments = {}
+        operations = []
+        for definition in document_ast.definitions:
+            if isinstance(definition, ast.FragmentDefinition):
+                self.fragments[definition.name.value] = definition
+            elif isinstance(definition, ast.OperationDefinition):
+                if operation_name is None or (
+                    definition.name and definition.name.value == operation_name
+                ):
+                    operations.append(definition)
+
+        if len(operations) == 1:
+            operation = operations[0]
+            root = (
+                schema.get_mutation_type()
+                if operation.operation == "mutation"
+                else schema.get_query_type()
+            )
+            self.visit(root, operation.selection_set, 1, 1, set())
+
+    def as_dict(self):
+        return {"depth": self.depth, "nodes": self.nodes, "cost": self.cost}
+
+    def get_argument(self, field_ast, name):
+        for argument in field_ast.arguments or []:
+            if argument.name.value == name:
+                value = argument.value
+                if isinstance(value, ast.Variable):
+                    return self.variables.get(value.name.value)
+                if isinstance(value, ast.IntValue):
+                    return int(value.value)
+        return None
+
+    def get_page_size(self, field_ast):
+        size = self.get_argument(field_ast, "first") or self.get_argument(
+            field_ast, "last"
+        )
+        if not size:
+            return self.default_page_size
+        # Variables arrive as sent, e.g. "5", before graphql-core coerces them
+        size = int(size)
+        if size < 0:
+            raise ValueError("Negative page size %s" % size)
+        return size
+
+    def visit(self, parent_type, selection_set, depth, multiplier, fragments):
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.FragmentSpread):
+                name = selection.name.value
+                # Cycles are rejected by validation, this just stops the walk
+                if name in fragments or name not in self.fragments:
+                    continue
+                fragment = self.fragments[name]
+                self.visit(
+                    self.schema.get_type(fragment.type_condition.name.value),
+                    fragment.selection_set,
+                    depth,
+                    multiplier,
+                    fragments | {name},
+                )
+            elif isinstance(selection, ast.InlineFragment):
+                condition = selection.type_condition
+                self.visit(
+                    condition and self.schema.get_type(condition.name.value)
+                    or parent_type,
+                    selection.selection_set,
+                    depth,
+                    multiplier,
+                    fragments,
+                )
+            else:
+                self.visit_field(parent_type, selection, depth, multiplier, fragments)
+
+    def visit_field(self, parent_type, field_ast, depth, multiplier, fragments):
+        self.nodes += 1
+        self.depth = max(self.depth, depth)
+
+        field = getattr(parent_type, "fields", {}).get(field_ast.name.value)
+        if field is None or not field_ast.selection_set:
+            return
+
+        field_type = field.type
+        named_type = get_named_type(field_type)
+        if is_connection(named_type):
+            multiplier *= self.get_page_size(field_ast)
+        elif not is_connection(parent_type):
+            # A connection's edges were counted by its page size
+            while hasattr(field_type, "of_type"):
+                if isinstance(field_type, GraphQLList):
+                    multiplier *= self.get_page_size(field_ast)
+                field_type = field_type.of_type
+
+        graphene_type = getattr(named_type, "graphene_type", None)
+        if isinstance(graphene_type, type) and issubclass(
+            graphene_type, DjangoObjectType
+        ):
+            self.cost += multiplier
+
+        self.visit(named_type, field_ast.selection_set, depth + 1, multiplier, fragments)
+
+    def check(self, max_depth=None, max_nodes=None, max_cost=None):
+        for name, value, limit in [
+            ("depth", self.depth, max_depth),
+            ("node count", self.nodes, max_nodes),
+            ("cost", self.cost, max_cost),
+        ]:
+            if limit is not None and value > limit:
+                raise QueryLimitExceeded(
+                    "Query %s %s exceeds the limit of %s" % (name, value, limit)
+                )
@@ -0,0 +1,58 @@
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from EasyAPI.scope import get_request_scope
+
+
+class ObjectLoader(DataLoader):
+    """
+    Loads a resource's permitted objects by pk. Every key asked for while one
+    level of a GraphQL query resolves is fetched with a single query.
+    """
+
+    def __init__(self, resource, user):
+        super(ObjectLoader, self).__init__()
+        self.resource = resource
+        self.user = user
+
+    def batch_load_fn(self, keys):
+        qs, audit = self.resource.get_permitted_queryset("list", user=self.user)
+        found = qs.in_bulk(keys)
+        return Promise.resolve([found.get(key) for key in keys])
+
+
+class RelatedLoader(DataLoader):
+    """
+    Loads the permitted rows of a resource whose foreign key field points at
+    each key, as one list per key, with a single query per batch. refine is
+    applied to the batched queryset, e.g. to run a FilterSet over it.
+    """
+
+    def __init__(self, resource, user, field, refine=None):
+        super(RelatedLoader, self).__init__()
+        self.resource = resource
+        self.user = user
+        self.field = field
+        self.refine = refine
+
+    def batch_load_fn(self, keys):
+        qs, audit = self.resource.get_permitted_queryset("list", user=self.user)
+        qs = qs.filter(**{"%s__in" % self.field.attname: keys})
+        if self.refine:
+            qs = self.refine(qs)
+
+        grouped = {key: [] for key in keys}
+        for row in qs:
+            grouped[getattr(row, self.field.attname)].append(row)
+        return Promise.resolve([grouped[key] for key in keys])
+
+
+def get_loader(key, create):
+    # Loaders live as long as the request's scope, so each level of a query
+    # shares one per key; outside a scope every call gets a fresh one
+    scope = get_request_scope()
+    if scope is None:
+        return create()
+    if key not in scope.loaders:
+        scope.loaders[key] = create()
+    return scope.loaders[key]
@@ -21,8 +21,11 @@ class EasyAPIMetadata(SimpleMetadata):
                     "model_name": view.model._meta.model_name,
                     "actions": actions,
                     "filters": filters,
+                    "search_fields": view.resource.search_fields,
                 }
             )
+            if view.resource.response_cache:
+                data["cache"] = view.resource.response_cache.stats()
             return data
 
         def api_metadata(self, request, view, data):
@@ -0,0 +1,146 @@
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework import exceptions
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the active OrderingFilter ordering, with
+    the pk appended as a tiebreaker. Each page is a single indexed range
+    query from the last row of the previous page, so deep pages cost the same
+    as the first, and no COUNT query is run. Cursors only go forwards.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    # EasyViewSet.list skips its Count header for paginators that set this
+    count_rows = False
+    # Cursors are read from model instances, so no values() rows
+    needs_instances = True
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        ordering, requested = [], []
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                backend = backend()
+                ordering = backend.get_ordering(request, queryset, view) or []
+                param = request.query_params.get(backend.ordering_param, "")
+                requested = [term.strip() for term in param.split(",")]
+        # The pk is always the last, unique tiebreaker, in the direction asked
+        # for, even as "id" which OrderingFilter doesn't know as a field
+        pks = [o for o in ordering + requested if o.lstrip("-") in ("pk", "id")]
+        tiebreaker = pks and pks[-1].startswith("-") and "-pk" or "pk"
+        ordering = [o for o in ordering if o not in pks] + [tiebreaker]
+
+        fields = []
+        for name in ordering:
+            field_name = name.lstrip("-")
+            try:
+                field = (
+                    queryset.model._meta.pk
+                    if field_name == "pk"
+                    else queryset.model._meta.get_field(field_name)
+                )
+            except FieldDoesNotExist:
+                field = None
+            if (
+                field is None
+                or not field.concrete
+                or field.many_to_many
+                or field.null
+            ):
+                raise exceptions.ValidationError(
+                    "Can't paginate by %s, keyset ordering must use "
+                    "non-null columns" % field_name
+                )
+            fields.append((name, field))
+        return fields
+
+    def encode_cursor(self, obj):
+        values = [field.value_to_string(obj) for name, field in self.ordering]
+        cursor = json.dumps([[name for name, field in self.ordering], values])
+        return base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            names, values = json.loads(
+                base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8")
+            )
+            if names != [name for name, field in self.ordering]:
+                raise ValueError("Cursor is for a different ordering")
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError("Cursor has the wrong number of values")
+            return [
+                field.to_python(value)
+                for (name, field), value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise exceptions.NotFound(self.invalid_cursor_message)
+
+    def get_keyset_filter(self, values):
+        # (a > va) | (a = va & b > vb) | (a = va & b = vb & pk > vpk) ...
+        clauses = []
+        for i, (name, field) in enumerate(self.ordering):
+            lookup = "lt" if name.startswith("-") else "gt"
+            equal = {
+                prev.attname: value
+                for (prev_name, prev), value in zip(self.ordering[:i], values)
+            }
+            after = {"%s__%s" % (field.attname, lookup): values[i]}
+            clauses.append(Q(**equal) & Q(**after))
+        return reduce(lambda a, b: a | b, clauses)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        queryset = queryset.order_by(
+            *[
+                (name.startswith("-") and "-" or "") + field.attname
+                for name, field in self.ordering
+            ]
+        )
+        values = self.decode_cursor(request)
+        if values is not None:
+            queryset = queryset.filter(self.get_keyset_filter(values))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
@@ -1,4 +1,6 @@
 from rest_framework.permissions import BasePermission
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.db.models import QuerySet
 
 
@@ -8,8 +10,9 @@ class AllowNone(BasePermission):
 
 
 class AuditLog(list):
-    def log(self, *args):
-        self.append(" ".join(args))
+    # Messages are %-formatted with args only when logged
+    def log(self, message, *args):
+        self.append(args and message % args or message)
 
     def add_child(self, other):
         self += ["  " + line for line in other]
@@ -18,13 +21,37 @@ class AuditLog(list):
         return "\n".join(line for line in self)
 
 
-def get_action_permission(resource, action, user):
-    context = resource.get_permission_context()
-    audit = AuditLog(
-        "get_action_permissions action=%s resource=%s user=%s api=%s"
-        % (action, resource.name, user, resource.api)
-    )
+class NullAuditLog(AuditLog):
+    """
+    Stands in for AuditLog unless settings.EASY_API_AUDIT_LOG is on, so the
+    permission checks don't build messages nobody reads.
+    """
+
+    def log(self, message, *args):
+        pass
+
+    def add_child(self, other):
+        pass
+
+    def append(self, line):
+        pass
+
+    def __iadd__(self, other):
+        return self
+
+
+def get_audit_log():
+    if getattr(settings, "EASY_API_AUDIT_LOG", False):
+        return AuditLog()
+    return NullAuditLog()
 
+
+def resolve_action_permission(resource, action, audit):
+    """
+    The part of an action's permission that doesn't depend on the user:
+    which context applies and which of its entries matches the action.
+    """
+    context = resource.get_permission_context()
     contexts = getattr(resource.model, "_permissions_contexts", {})
     permission = None
 
@@ -33,77 +60,168 @@ def get_action_permission(resource, action, user):
         context = context(resource)
 
     if context in [True, False, None]:
-        audit.log("Callable context is a boolean, returning %s" % context)
-        return context, audit
+        audit.log("Callable context is a boolean, returning %s", context)
+        return context
 
     if permission is None and not contexts:
         audit.log("No contexts, returning None")
-        return None, audit
+        return None
 
     if permission is None and context not in contexts:
         if "*" in contexts:
-            audit.log("%s not found in contexts, falling back to * context" % context)
+            audit.log("%s not found in contexts, falling back to * context", context)
             context = "*"
         else:
             audit.log(
-                "%s not found in contexts %s for %s, returning None"
-                % (context, list(contexts.keys()), resource.name)
+                "%s not found in contexts %s for %s, returning None",
+                context,
+                list(contexts.keys()),
+                resource.name,
             )
-            return None, audit
+            return None
 
     if callable(contexts[context]):
-        audit.log("Matched callable permission for context %s" % (context))
-        return contexts[context], audit
+        audit.log("Matched callable permission for context %s", context)
+        return contexts[context]
 
     permission = contexts[context]
 
     if isinstance(permission, dict):
         if action in permission:
-            audit.log("Matched context action", context, action)
+            audit.log("Matched context action %s %s", context, action)
             permission = permission[action]
         elif (
             action in ["list", "retrieve", "metadata"]
             or resource.actions.get(action, {}).get("read_only")
         ) and "read" in permission:
-            audit.log("Matched readonly action", context, action)
+            audit.log("Matched readonly action %s %s", context, action)
             permission = permission["read"]
         elif "*" in permission:
-            audit.log("Matched global action", context)
+            audit.log("Matched global action %s", context)
             permission = contexts[context]["*"]
         else:
-            audit.log("%s not found in context %s, denying" % (action, context))
+            audit.log("%s not found in context %s, denying", action, context)
             permission = None
 
     if callable(permission):
         audit.log("Returning callable permission...")
-        return permission, audit
+        return permission
 
     if isinstance(permission, str):
         if permission == "*":
             audit.log("Permission is *, allowing...")
-            return True, audit
+            return True
         if permission in resource.relations:
-            audit.log(
-                'Permission is a relation "%s", deferring to later...' % permission
-            )
-            return permission, audit
+            audit.log('Permission is a relation "%s", deferring to later...', permission)
+            return permission
 
     if permission in [True, False, None]:
-        audit.log("Permission is %s" % permission)
-        return permission, audit
+        audit.log("Permission is %s", permission)
+        return permission
+
+    audit.log("Unknown permission %s, returning it", permission)
+
+    return permission
+
+
+STANDARD_ACTIONS = ["list", "retrieve", "create", "update", "partial_update", "destroy"]
 
-    audit.log("Unknown permission %s, returning it" % permission)
 
+def get_permission_decision(resource, action):
+    # Resolved once per (context, action) and kept on the resource, along with
+    # the audit lines explaining it
+    key = (resource.get_permission_context(), action)
+    try:
+        return resource.permission_decisions[key]
+    except KeyError:
+        lines = AuditLog()
+        permission = resolve_action_permission(resource, action, lines)
+        resource.permission_decisions[key] = (permission, lines)
+        return permission, lines
+
+
+def precompute_permissions(resource, actions=None):
+    for action in actions or STANDARD_ACTIONS + list(resource.actions):
+        permission = get_permission_decision(resource, action)[0]
+        if isinstance(permission, str) and permission in resource.relations:
+            # Completed when the rest of the chain is registered
+            try:
+                get_relation_path(resource, permission, action)
+            except ImproperlyConfigured:
+                pass
+
+
+def narrows_default_queryset(resource):
+    from EasyAPI.resources import ModelResource
+
+    return (
+        type(resource).get_default_queryset
+        is not ModelResource.get_default_queryset
+    )
+
+
+def get_relation_path(resource, relation, action):
+    """
+    Follows a relation permission through every related resource whose own
+    permission for action is a relation too, so Purchase's "customer" with
+    Customer's "store" becomes ("customer__store", <StoreResource>). Rows are
+    then filtered by one lookup against the last resource's permitted rows,
+    instead of a subquery per hop. The chain stops at a resource overriding
+    get_default_queryset(), whose permitted rows are then looked up as usual.
+    """
+    key = (resource.get_permission_context(), action, relation)
+    if key in resource.permission_paths:
+        return resource.permission_paths[key]
+
+    names, current, seen = [], resource, {resource}
+    while True:
+        names.append(relation)
+        related = current.api.get_resource_for_model(
+            current.model_fields[relation].remote_field.model
+        )
+        if related is None:
+            raise ImproperlyConfigured(
+                'Permission relation "%s" on %s leads to an unregistered model'
+                % (relation, current.name)
+            )
+        current = related
+        relation = get_permission_decision(current, action)[0]
+        if (
+            narrows_default_queryset(current)
+            or not isinstance(relation, str)
+            or relation not in current.relations
+            or current in seen
+        ):
+            break
+        seen.add(current)
+
+    resource.permission_paths[key] = ("__".join(names), current)
+    return resource.permission_paths[key]
+
+
+def get_action_permission(resource, action, user):
+    permission, lines = get_permission_decision(resource, action)
+
+    audit = get_audit_log()
+    audit.log(
+        "get_action_permissions action=%s resource=%s user=%s api=%s",
+        action,
+        resource.name,
+        user,
+        resource.api,
+    )
+    audit += lines
     return permission, audit
 
 
 def get_permitted_queryset(resource, action, user=None, qs=None):
-    audit = AuditLog(["get_permitted_queryset on %s for %s" % (resource.name, user)])
+    audit = get_audit_log()
+    audit.log("get_permitted_queryset on %s for %s", resource.name, user)
 
-    if not qs:
+    if qs is None:
         audit.log(
-            "No queryset specified, starting with %s.objects.all()"
-            % resource.model._meta.object_name
+            "No queryset specified, starting with %s.objects.all()",
+            resource.model._meta.object_name,
         )
         qs = resource.model.objects.all()
 
@@ -120,30 +238,21 @@ def get_permitted_queryset(resource, action, user=None, qs=None):
             audit.log("Permission is *, allowing...")
             permission = True
         if permission in resource.relations:
+            audit.log('Permission is a string "%s", looking for relations...', permission)
+            path, terminal = get_relation_path(resource, permission, action)
             audit.log(
-                'Permission is a string "%s", looking for relations...' % permission
-            )
-            related_field = resource.model_fields[permission]
-            related_resource = resource.api.get_resource_for_model(
-                related_field.remote_field.model
-            )
-            audit.log(
-                "Matched permission %s to relation %s" % (permission, related_resource)
-            )
-            sub_query, sub_audit = related_resource.get_permitted_queryset(
-                action, user=user
-            )
-            permission = qs.filter(
-                **{
-                    "%s_id__in"
-                    % permission: sub_query.values_list("id", flat=True).distinct()
-                }
+                "Compiled relation chain %s to %s",
+                path.replace("__", " -> "),
+                terminal.name,
             )
-            audit += ["  " + line for line in sub_audit]
+            sub_query, sub_audit = terminal.get_permitted_queryset(action, user=user)
+            permission = qs.filter(**{"%s__in" % path: sub_query.values("pk")})
+            audit.add_child(sub_audit)
         else:
             audit.log(
-                'Couldnt match permission "%s" to any relation on %s'
-                % (permission, resource.model)
+                'Couldnt match permission "%s" to any relation on %s',
+                permission,
+                resource.model,
             )
             permission = False
 
@@ -158,13 +267,13 @@ def get_permitted_queryset(resource, action, user=None, qs=None):
         audit.log("Permission denied, returning none")
         return qs.none(), audit
 
-    audit.log("Unknown permission %s, returning nothing" % permission)
+    audit.log("Unknown permission %s, returning nothing", permission)
     return qs.none(), audit
 
 
 def get_permitted_object(resource, id, action, user=None, qs=None):
     qs, audit = resource.get_permitted_queryset(action, user=user, qs=qs)
     result = qs.filter(id=id).first()
-    audit.append("Filtering queryset for id=%s, got: %s" % (id, result))
+    audit.log("Filtering queryset for id=%s, got: %s", id, result)
 
     return result, audit
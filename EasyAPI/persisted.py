@@ -0,0 +1,145 @@
+import collections
+import hashlib
+import json
+import threading
+from functools import partial
+
+from django.core.cache import caches
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.error import GraphQLError
+from graphql.execution import ExecutionResult, execute
+from graphql.language.base import parse
+from graphql.validation import validate
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def invalid_result(errors):
+    return lambda *args, **kwargs: ExecutionResult(errors=errors, invalid=True)
+
+
+class DocumentCache(GraphQLBackend):
+    """
+    A GraphQL backend keeping the most recently used documents, parsed and
+    validated against the schema, keyed by the sha256 of their text. Cached
+    documents execute without being parsed or validated again.
+    """
+
+    def __init__(self, max_size=500, executor=None):
+        self.max_size = max_size
+        self.execute_params = {"executor": executor}
+        self.documents = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def build(self, schema, query):
+        # Syntax errors are raised, like the core backend does
+        document_ast = parse(query)
+        errors = validate(schema, document_ast)
+        return GraphQLDocument(
+            schema=schema,
+            document_string=query,
+            document_ast=document_ast,
+            execute=errors
+            and invalid_result(errors)
+            or partial(execute, schema, document_ast, **self.execute_params),
+        )
+
+    def document_from_string(self, schema, query):
+        key = (id(schema), query_hash(query))
+        with self.lock:
+            document = self.documents.get(key)
+            if document is not None and document.schema is schema:
+                self.documents.move_to_end(key)
+                self.hits += 1
+                return document
+            self.misses += 1
+
+        document = self.build(schema, query)
+        with self.lock:
+            self.documents[key] = document
+            while len(self.documents) > self.max_size:
+                self.documents.popitem(last=False)
+        return document
+
+
+class PersistedQueryError(GraphQLError):
+    def __init__(self, message, code):
+        super(PersistedQueryError, self).__init__(
+            message, extensions={"code": code}
+        )
+
+
+class PersistedQueries(object):
+    """
+    Query texts stored by their sha256 in one of Django's caches, so clients
+    can send just the hash. Follows Apollo's automatic persisted queries: a
+    request with extensions.persistedQuery.sha256Hash and no query is looked
+    up, and one with both stores the query for later.
+    """
+
+    def __init__(self, prefix, alias="default", timeout=None):
+        self.prefix = prefix
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_key(self, sha):
+        return "easyapi:persisted:%s:%s" % (self.prefix, sha)
+
+    def add(self, query, sha=None):
+        if sha is not None and sha != query_hash(query):
+            raise PersistedQueryError(
+                "provided sha does not match query", "INVALID_PERSISTED_QUERY"
+            )
+        sha = sha or query_hash(query)
+        self.cache.set(self.get_key(sha), query, self.timeout)
+        return sha
+
+    def get(self, sha):
+        return self.cache.get(self.get_key(sha))
+
+    def warm(self, path):
+        """
+        Stores every query in a JSON file, either a list of queries or a
+        {sha256: query} object like persisted query manifests, returning
+        how many there were.
+        """
+        with open(path) as f:
+            queries = json.load(f)
+        if isinstance(queries, dict):
+            for sha, query in queries.items():
+                self.add(query, sha)
+        else:
+            for query in queries:
+                self.add(query)
+        return len(queries)
+
+    def resolve(self, query, extensions):
+        # Returns the query to run for a request
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                extensions = None
+        persisted = (extensions or {}).get("persistedQuery")
+        if not isinstance(persisted, dict) or not persisted.get("sha256Hash"):
+            return query
+
+        sha = persisted["sha256Hash"]
+        if query:
+            self.add(query, sha)
+            return query
+
+        query = self.get(sha)
+        if query is None:
+            raise PersistedQueryError(
+                "PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"
+            )
+        return query
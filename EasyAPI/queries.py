@@ -0,0 +1,109 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+def get_relation_path(model, attrs):
+    # Walk a serializer source like ["store", "owner", "username"] across the
+    # model's relations, returning the relation part of it and whether any
+    # hop along the way is multi-valued (so it needs prefetching)
+    path = []
+    many = False
+    for attr in attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        path.append(attr)
+        many = many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    return "__".join(path), many
+
+
+def plan_queryset(resource, serializer_class=None):
+    """
+    Decide, once per resource, how every serialized field should be loaded.
+    Returns {field_name: ("select" | "prefetch", lookup)} for the fields that
+    would otherwise hit the database once per row.
+    """
+    plan = {}
+    serializer = (serializer_class or resource.serializer_class)()
+
+    for name, field in serializer.fields.items():
+        if field.write_only or field.source == "*":
+            continue
+
+        attrs = field.source_attrs
+        lookup, many = get_relation_path(resource.model, attrs)
+        if not lookup:
+            continue
+
+        # A plain FK rendered as its pk is read from the local <fk>_id column
+        if (
+            isinstance(field, RelatedField)
+            and field.use_pk_only_optimization()
+            and len(attrs) == 1
+        ):
+            continue
+
+        if many or isinstance(field, (ManyRelatedField, serializers.ListSerializer)):
+            plan[name] = ("prefetch", lookup)
+        else:
+            plan[name] = ("select", lookup)
+
+    return plan
+
+
+def get_prefetch(resource, lookup, user=None):
+    # Single hop prefetches to a registered resource only load the rows that
+    # resource would let this user list
+    if "__" in lookup:
+        return lookup
+    related = resource.api.get_resource_for_model(
+        resource.model._meta.get_field(lookup).related_model
+    )
+    if not related:
+        return lookup
+    qs, audit = related.get_permitted_queryset("list", user=user)
+    return Prefetch(lookup, queryset=qs)
+
+
+def get_query_plan(resource, fields=None):
+    select_related, prefetch_related = [], []
+    for name, (kind, lookup) in resource.query_plan.items():
+        if fields is not None and name not in fields:
+            continue
+        if kind == "select":
+            select_related.append(lookup)
+        else:
+            prefetch_related.append(lookup)
+
+    # Serialized APIProperties bring the relations they declare reading
+    for name, hints in resource.property_hints.items():
+        if name not in resource.readable_fields:
+            continue
+        if fields is not None and name not in fields:
+            continue
+        select_related += hints["select_related"]
+        prefetch_related += hints["prefetch_related"]
+    return (
+        list(dict.fromkeys(select_related)),
+        list(dict.fromkeys(prefetch_related)),
+    )
+
+
+def get_prefetches(resource, user=None, fields=None):
+    select_related, prefetch_related = get_query_plan(resource, fields=fields)
+    return [get_prefetch(resource, lookup, user=user) for lookup in prefetch_related]
+
+
+def apply_query_plan(resource, qs, user=None, fields=None):
+    select_related, prefetch_related = get_query_plan(resource, fields=fields)
+    if select_related:
+        qs = qs.select_related(*select_related)
+    if prefetch_related:
+        qs = qs.prefetch_related(*get_prefetches(resource, user=user, fields=fields))
+    return qs
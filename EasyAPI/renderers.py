@@ -0,0 +1,68 @@
+import csv
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class Echo(object):
+    # csv.writer wants a file, this hands each written line straight back
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(v) for v in value)
+    return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([csv_value(row.get(name)) for name in header])
+
+
+def ndjson_lines(rows):
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders a list (or a single object) of serialized rows as CSV. Lists are
+    normally streamed by EasyViewSet instead, this covers everything else.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return ""
+        if isinstance(data, dict):
+            data = data.get("results", [data])
+        header = list(data[0].keys()) if data else []
+        return "".join(csv_lines(header, data))
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders serialized rows as newline delimited JSON, one object per line.
+    Like CSV, lists are streamed by EasyViewSet and this covers the rest.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return ""
+        if isinstance(data, dict):
+            data = data.get("results", [data])
+        return "".join(ndjson_lines(data))
@@ -1,4 +1,5 @@
 import collections
+import threading
 from weakref import WeakSet
 
 import graphene
@@ -19,10 +20,16 @@ import django_filters
 from EasyAPI.filters import EasyFilters
 from EasyAPI.metadata import EasyAPIMetadata
 from EasyAPI.serializers import EasySerializable
+from EasyAPI.queries import plan_queryset, apply_query_plan, get_prefetches
+from EasyAPI.compiler import compile_row_converter, compile_serializer_class
+from EasyAPI.cache import ResponseCache
+from EasyAPI.scope import remember_object, remember_queryset
+from EasyAPI.search import get_search_backend_class
 from EasyAPI.permissions import (
     get_action_permission,
     get_permitted_queryset,
     get_permitted_object,
+    precompute_permissions,
 )
 
 
@@ -45,8 +52,25 @@ class ModelResource(object):
     viewset_class = None
     filterset_class = None
     serializer_class = None
+    pagination_class = None
     admin_class = None
     properties = None
+    query_plan = None
+    stream_chunk_size = 1000
+    values_fast_path = True
+    compiled = False
+    serializer_cache_size = 100  # Sparse serializers and row converters kept
+    conditional_get = True
+    last_modified_field = None
+    response_cache_class = ResponseCache
+    cache_alias = None  # Name of a Django cache to keep rendered responses in
+    cache_timeout = 300
+    bulk_actions = False  # Let PATCH and DELETE on the list route touch every match
+    bulk_max_rows = 1000  # Most rows one bulk create, update or delete may touch
+    bulk_batch_size = 500
+    natural_key = None  # Fields that identify a row for the upsert route
+    search_fields = []  # Text fields indexed for ?search=
+    search_backend_class = None  # Picked from the database vendor by default
     actions = {}
     filters = {}
     fields = []
@@ -72,7 +96,9 @@ class ModelResource(object):
         viewset_class=None,
         filterset_class=None,
         serializer_class=None,
+        pagination_class=None,
         admin_class=None,
+        query_plan=None,  # {field: ("select" | "prefetch", lookup)} for related data
         dump_info=False,  # Print the full resource to the console upon mounting
     ):
         # Part 1: Set attributes
@@ -131,13 +157,77 @@ class ModelResource(object):
         # Part 3: Complex setups
         self.inlines = inlines or self.inlines
 
+        # Model filters are declared on the assembled FilterSet
+        self.filters = (
+            filters
+            or self.filters
+            or {
+                attr: getattr(value, "_APIFilter", {})
+                for attr, value in self.model_attributes.items()
+                if isinstance(value, django_filters.Filter)
+            }
+        )
         self.filterset_class = (
             filterset_class or self.filterset_class or EasyFilters.Assemble(self)
         )
         self.serializer_class = (
             serializer_class or self.serializer_class or EasySerializable.Assemble(self)
         )
+        self.pagination_class = (
+            pagination_class or self.pagination_class or self.api.pagination_class
+        )
         self.admin_class = admin_class or self.admin_class or admin.ModelAdmin
+        self.query_plan = query_plan or self.query_plan or plan_queryset(self)
+        self.readable_fields = [
+            name
+            for name, field in self.serializer_class().fields.items()
+            if not field.write_only and name != "pk"
+        ]
+        self.sparse_serializers = collections.OrderedDict()
+        self.row_converters = collections.OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.permission_decisions = {}
+        self.permission_paths = {}
+        self.get_row_converter(self.serializer_class)
+        self.response_cache = (
+            self.cache_alias
+            and self.response_cache_class(self, self.cache_alias, self.cache_timeout)
+            or None
+        )
+
+        if self.natural_key:
+            from django.core.exceptions import ImproperlyConfigured
+
+            unknown = [
+                f
+                for f in self.natural_key
+                if f not in self.model_fields_simple or f not in self.fields
+            ]
+            if unknown:
+                raise ImproperlyConfigured(
+                    "natural_key %s of %s must be concrete, listed fields"
+                    % (unknown, self.model._meta.object_name)
+                )
+
+        self.search_backend = None
+        if self.search_fields:
+            from django.core.exceptions import ImproperlyConfigured
+            from EasyAPI.filters import TEXT_FIELDS
+
+            unknown = [
+                f
+                for f in self.search_fields
+                if not isinstance(self.model_fields_simple.get(f), TEXT_FIELDS)
+            ]
+            if unknown:
+                raise ImproperlyConfigured(
+                    "search_fields %s of %s must be text fields"
+                    % (unknown, self.model._meta.object_name)
+                )
+            backend_class = self.search_backend_class or get_search_backend_class(
+                self.model
+            )
+            self.search_backend = backend_class(self)
 
         self.filterset = self.filterset_class()
 
@@ -145,9 +235,9 @@ class ModelResource(object):
             field: get_gql_type(self.model_fields, field)
             for field in self.fields + self.inlines + ["id",]
             if self.api.graphql
+            and field in self.model_fields
             and not isinstance(self.model_fields[field], GenericForeignKey)
             and field not in self.write_only
-            and field in self.model_fields
         }
 
         # need to rewrite this with dir() like below
@@ -165,6 +255,9 @@ class ModelResource(object):
             for name in self.properties
             if getattr(getattr(self.model, name, None), "_APIProperty", False)
         }
+        self.property_hints = {
+            name: getattr(self.model, name)._APIHints for name in self.property_map
+        }
 
         self.actions = (
             actions
@@ -176,16 +269,6 @@ class ModelResource(object):
             }
         )
 
-        self.filters = (
-            filters
-            or self.filters
-            or {
-                attr: getattr(value, "_APIFilter", {})
-                for attr, value in self.model_attributes.items()
-                if isinstance(value, django_filters.Filter)
-            }
-        )
-
     @property
     def model_attributes(self):
         return dict(
@@ -236,20 +319,115 @@ class ModelResource(object):
     def get_action_permission(self, action, user=None):
         return get_action_permission(self, action, user=user)
 
+    def precompute_permissions(self, actions=None):
+        return precompute_permissions(self, actions=actions)
+
     def get_permitted_object(self, id, action, user=None, qs=None):
-        return get_permitted_object(self, id, action, user=user, qs=qs)
+        if qs is not None:
+            return get_permitted_object(self, id, action, user=user, qs=qs)
+        return remember_object(
+            self,
+            action,
+            user,
+            id,
+            lambda: get_permitted_object(self, id, action, user=user),
+        )
 
     def get_permitted_queryset(self, action, user=None, qs=None):
-        return get_permitted_queryset(
-            self, action, user=user, qs=qs or self.get_default_queryset()
+        if qs is not None:
+            return get_permitted_queryset(self, action, user=user, qs=qs)
+        # Only the default queryset's answer is shared within a request
+        return remember_queryset(
+            self,
+            action,
+            user,
+            lambda: get_permitted_queryset(
+                self, action, user=user, qs=self.get_default_queryset()
+            ),
         )
 
+    def apply_query_plan(self, qs, user=None, fields=None):
+        return apply_query_plan(self, qs, user=user, fields=fields)
+
+    def get_prefetches(self, user=None, fields=None):
+        return get_prefetches(self, user=user, fields=fields)
+
+    def get_cached(self, cache, key, build):
+        """
+        cache[key], built on a miss. Only the serializer_cache_size most
+        recently used entries are kept, as ?fields= lets clients ask for any
+        number of distinct field sets.
+        """
+        with self.cache_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        value = build()
+        with self.cache_lock:
+            cache[key] = value
+            while len(cache) > self.serializer_cache_size:
+                cache.popitem(last=False)
+        return value
+
+    def get_sparse_serializer(self, fields):
+        # Trimmed serializers are assembled once per distinct field set
+        key = tuple(f for f in self.readable_fields if f in fields)
+
+        def build():
+            serializer_class = EasySerializable.Assemble(self, only=key)
+            if self.compiled:
+                serializer_class = compile_serializer_class(
+                    serializer_class, self.model
+                )
+            return serializer_class
+
+        return self.get_cached(self.sparse_serializers, key, build)
+
+    def compile(self):
+        """
+        Switch output to a serializer function generated for this resource's
+        fields. Writes are still validated by the DRF serializer.
+        """
+        if not getattr(self.serializer_class, "compiled_from", None):
+            self.serializer_class = compile_serializer_class(
+                self.serializer_class, self.model
+            )
+        self.compiled = True
+        self.sparse_serializers = collections.OrderedDict()
+
+    def get_row_converter(self, serializer_class):
+        """
+        A converter from queryset.values() rows to serializer_class output, or
+        None when serializer_class needs real model instances.
+        """
+        if not self.values_fast_path:
+            return None
+        return self.get_cached(
+            self.row_converters,
+            serializer_class,
+            lambda: compile_row_converter(serializer_class, self.model),
+        )
+
+    def get_sparse_queryset(self, qs, fields):
+        columns = [f for f in fields if f in self.model_fields_simple]
+        for name in fields:
+            if name in self.property_hints:
+                # Properties without an only hint may read any column
+                if self.property_hints[name]["only"] is None:
+                    return qs
+                columns += self.property_hints[name]["only"]
+        return qs.only("pk", *columns)
+
     def get_default_queryset(self):
         return self.model.objects.all()
 
     def generate_viewset(self):
         from .views import EasyViewSet
 
+        extra = {}
+        if self.pagination_class:
+            extra["pagination_class"] = self.pagination_class
+
         return (self.viewset_class or EasyViewSet).Assemble(
             model=self.model,
             fields=self.fields,
@@ -257,6 +435,7 @@ class ModelResource(object):
             permissions=self.permissions + self.api.permissions,
             description=self.description,
             serializer_class=self.serializer_class,
+            **extra
         )
 
     def generate_graphql(self):
@@ -315,6 +494,7 @@ class ModelResource(object):
         print("\tReversRels: ", self.reverse_relations)
         print("\tManyToMany: ", self.many_to_many)
         print()
+        print("\tQueryPlan:  ", self.query_plan)
         print("\tInlines:    ", self.inlines)
         print("\tProperties: ", self.properties)
         print("\tActions:    ", list(self.actions.keys()))
@@ -0,0 +1,32 @@
+from rest_framework.routers import DefaultRouter
+
+BULK_ACTIONS = ["bulk_update", "bulk_destroy"]
+
+
+class EasyRouter(DefaultRouter):
+    """
+    A DefaultRouter whose list route also takes PATCH and DELETE, which
+    EasyViewSet applies to the whole filtered queryset, for resources that
+    opt in with bulk_actions = True.
+    """
+
+    routes = [
+        DefaultRouter.routes[0]._replace(
+            mapping=dict(
+                DefaultRouter.routes[0].mapping,
+                patch="bulk_update",
+                delete="bulk_destroy",
+            )
+        )
+    ] + DefaultRouter.routes[1:]
+
+    def get_method_map(self, viewset, method_map):
+        bound_methods = super(EasyRouter, self).get_method_map(viewset, method_map)
+        resource = getattr(viewset, "resource", None)
+        if resource is None or not resource.bulk_actions:
+            bound_methods = {
+                method: action
+                for method, action in bound_methods.items()
+                if action not in BULK_ACTIONS
+            }
+        return bound_methods
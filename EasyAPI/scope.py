@@ -0,0 +1,75 @@
+import contextvars
+from contextlib import contextmanager
+
+current_scope = contextvars.ContextVar("easyapi_request_scope", default=None)
+
+
+class RequestScope(object):
+    """
+    Remembers permitted querysets and objects fetched by pk for the length of
+    one request, keyed by resource, action and user, so permission checks,
+    get_queryset, get_object and relation permissions that ask the same
+    question share one answer.
+    """
+
+    def __init__(self):
+        self.querysets = {}
+        self.objects = {}
+        self.loaders = {}
+        self.hits = 0
+        self.misses = 0
+
+    def remember(self, store, key, compute):
+        if key in store:
+            self.hits += 1
+            return store[key]
+        self.misses += 1
+        store[key] = compute()
+        return store[key]
+
+
+def get_request_scope():
+    return current_scope.get()
+
+
+@contextmanager
+def request_scope():
+    # Nested views and resolvers share the outermost request's scope
+    scope = current_scope.get()
+    if scope is not None:
+        yield scope
+        return
+
+    scope = RequestScope()
+    token = current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        current_scope.reset(token)
+
+
+def scope_key(resource, action, user, *extra):
+    return (resource.api.name, resource.label, action, user and user.pk) + extra
+
+
+def remember_queryset(resource, action, user, compute):
+    """
+    compute() -> (queryset, audit). Each caller gets its own clone of the
+    remembered queryset, so evaluating one doesn't fill the others' caches.
+    """
+    scope = get_request_scope()
+    if scope is None:
+        return compute()
+    qs, audit = scope.remember(
+        scope.querysets, scope_key(resource, action, user), compute
+    )
+    return qs.all(), audit
+
+
+def remember_object(resource, action, user, pk, compute):
+    scope = get_request_scope()
+    if scope is None:
+        return compute()
+    return scope.remember(
+        scope.objects, scope_key(resource, action, user, str(pk)), compute
+    )
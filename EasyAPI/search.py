@@ -0,0 +1,249 @@
+import hashlib
+import re
+from functools import reduce
+
+from django.db import connections, models, router
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+
+def search_tokens(term):
+    return re.findall(r"\w+", term)
+
+
+def has_integer_pk(model):
+    # FTS5 content tables key rows by rowid, so only integer pks can be used
+    field = model._meta.pk
+    while field.is_relation:
+        field = field.target_field
+    return isinstance(field, (models.AutoField, models.IntegerField))
+
+
+class BaseSearchBackend(object):
+    """
+    Full-text search over a resource's search_fields. search() narrows the
+    queryset it's given, so the permitted queryset and filters still apply,
+    and when ranked is set it orders the matches best first.
+    """
+
+    def __init__(self, resource):
+        self.resource = resource
+        self.model = resource.model
+        self.fields = [self.model._meta.get_field(f) for f in resource.search_fields]
+        resource.api.search_backends.append(self)
+
+    def search(self, queryset, term, ranked=True):
+        raise NotImplementedError
+
+
+class ContainsSearchBackend(BaseSearchBackend):
+    # Unindexed fallback for databases without a backend of their own
+    def search(self, queryset, term, ranked=True):
+        for token in search_tokens(term):
+            queryset = queryset.filter(
+                reduce(
+                    lambda a, b: a | b,
+                    [models.Q(**{"%s__icontains" % f.name: token}) for f in self.fields],
+                )
+            )
+        return queryset
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    Searches an FTS5 index over the model's table. The index is an external
+    content table kept in sync by triggers, so it also sees bulk_create(),
+    update() and raw SQL writes. Indexes are created (and filled from
+    existing rows) by migrate or create_search_indexes, never during a
+    request; until then searches fall back to unindexed icontains lookups,
+    as they always do for models without an integer pk.
+    """
+
+    def __init__(self, resource):
+        super(SQLiteSearchBackend, self).__init__(resource)
+        self.table = self.model._meta.db_table
+        # Resources searching other columns of the same table get their own index
+        columns = ",".join(f.column for f in self.fields)
+        digest = hashlib.md5(columns.encode("utf-8")).hexdigest()[:8]
+        self.index = "%s_fts_%s" % (self.table, digest)
+        self.pk = self.model._meta.pk.column
+        self.indexable = has_integer_pk(self.model)
+        self.indexed = set()
+
+    def get_triggers(self, quote):
+        index, table, pk = quote(self.index), quote(self.table), quote(self.pk)
+        columns = ", ".join(quote(f.column) for f in self.fields)
+        new = ", ".join("new.%s" % quote(f.column) for f in self.fields)
+        old = ", ".join("old.%s" % quote(f.column) for f in self.fields)
+        insert = "INSERT INTO %s(rowid, %s) VALUES (new.%s, %s);" % (
+            index, columns, pk, new,
+        )
+        delete = "INSERT INTO %s(%s, rowid, %s) VALUES ('delete', old.%s, %s);" % (
+            index, index, columns, pk, old,
+        )
+
+        def trigger(suffix, event, body):
+            return "CREATE TRIGGER %s AFTER %s ON %s BEGIN %s END" % (
+                quote(self.index + suffix), event, table, body,
+            )
+
+        return {
+            self.index + "_ai": trigger("_ai", "INSERT", insert),
+            self.index + "_ad": trigger("_ad", "DELETE", delete),
+            self.index + "_au": trigger("_au", "UPDATE", delete + " " + insert),
+        }
+
+    def get_schema(self, quote, existing=()):
+        """
+        Statements creating whatever of the index and its triggers isn't in
+        existing, then refilling the index, which may have missed writes
+        while a trigger was gone.
+        """
+        index = quote(self.index)
+        columns = ", ".join(quote(f.column) for f in self.fields)
+        statements = []
+        if self.index not in existing:
+            statements.append(
+                "CREATE VIRTUAL TABLE %s USING fts5(%s, content=%s, content_rowid=%s)"
+                % (index, columns, quote(self.table), quote(self.pk))
+            )
+        for name, statement in self.get_triggers(quote).items():
+            if name not in existing:
+                statements.append(statement)
+        statements.append("INSERT INTO %s(%s) VALUES ('rebuild')" % (index, index))
+        return statements
+
+    def get_names(self, connection):
+        return [self.index] + list(self.get_triggers(connection.ops.quote_name))
+
+    def get_existing(self, connection):
+        # The index and those of its triggers that are in the database
+        names = self.get_names(connection)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name IN (%s)"
+                % ", ".join(["%s"] * len(names)),
+                names,
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def has_index(self, connection):
+        if not self.indexable:
+            return False
+        if connection.alias in self.indexed:
+            return True
+        # Without every trigger the index goes stale, so it isn't used
+        if self.get_existing(connection) == set(self.get_names(connection)):
+            self.indexed.add(connection.alias)
+            return True
+        return False
+
+    def ensure_index(self, connection):
+        if not self.indexable or self.has_index(connection):
+            return
+        existing = self.get_existing(connection)
+        with connection.cursor() as cursor:
+            for statement in self.get_schema(connection.ops.quote_name, existing):
+                cursor.execute(statement)
+        self.indexed.add(connection.alias)
+
+    def search(self, queryset, term, ranked=True):
+        tokens = search_tokens(term)
+        if not tokens:
+            return queryset
+        # Each word quoted so user input can't be read as FTS5 syntax
+        match = " ".join('"%s"*' % token for token in tokens)
+
+        connection = connections[queryset.db]
+        if not self.has_index(connection):
+            return ContainsSearchBackend.search(self, queryset, term, ranked)
+        quote = connection.ops.quote_name
+        index = quote(self.index)
+
+        pk = "%s.%s" % (quote(self.table), quote(self.pk))
+        # pk__in=RawSQL() would wrap the subquery in a second pair of
+        # parentheses, which SQLite reads as a one item list
+        where = "%s IN (SELECT rowid FROM %s WHERE %s MATCH %%s)" % (pk, index, index)
+        queryset = queryset.extra(where=[where], params=[match])
+        if not ranked:
+            return queryset
+        rank = RawSQL(
+            "SELECT rank FROM %s WHERE %s MATCH %%s AND rowid = %s" % (index, index, pk),
+            [match],
+        )
+        return queryset.annotate(search_rank=rank).order_by("search_rank", "pk")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Postgres full-text search. Add a GIN index on the same SearchVector for
+    the lookups to use it.
+    """
+
+    config = "english"
+
+    def search(self, queryset, term, ranked=True):
+        from django.contrib.postgres.search import (
+            SearchQuery,
+            SearchRank,
+            SearchVector,
+        )
+
+        if not search_tokens(term):
+            return queryset
+        vector = SearchVector(*[f.name for f in self.fields], config=self.config)
+        query = SearchQuery(term, config=self.config)
+        queryset = queryset.annotate(search_vector=vector).filter(search_vector=query)
+        if not ranked:
+            return queryset
+        return queryset.annotate(search_rank=SearchRank(vector, query)).order_by(
+            "-search_rank", "pk"
+        )
+
+
+def create_search_indexes(using="default", apis=None, **kwargs):
+    """
+    post_migrate handler creating the FTS5 indexes of every registered api's
+    resources (or just those of apis) up front, so they aren't created in the
+    middle of a request's transaction.
+    """
+    from EasyAPI.api import all_apis
+
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    tables = connection.introspection.table_names()
+    for api in all_apis if apis is None else apis:
+        for backend in api.search_backends:
+            if isinstance(backend, SQLiteSearchBackend) and backend.table in tables:
+                backend.ensure_index(connection)
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend_class(model):
+    vendor = connections[router.db_for_read(model)].vendor
+    if vendor == "sqlite" and not has_integer_pk(model):
+        return ContainsSearchBackend
+    return BACKENDS.get(vendor, ContainsSearchBackend)
+
+
+class EasySearchFilter(BaseFilterBackend):
+    """
+    ?search= over the resource's search_fields. Matches are ranked unless the
+    request asks for an ?ordering.
+    """
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "").strip()
+        backend = getattr(view, "resource", None) and view.resource.search_backend
+        if not term or not backend:
+            return queryset
+        ranked = not request.query_params.get("ordering")
+        return backend.search(queryset, term, ranked=ranked)
@@ -0,0 +1,124 @@
+import collections
+
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import ast
+
+# Arguments of a connection that don't change which rows are loaded
+PAGINATION_ARGS = ["first", "last", "before", "after", "offset"]
+
+
+def collect_selections(info, field_asts):
+    """
+    {field name: [field asts]} for everything selected under field_asts, with
+    fragment spreads and inline fragments merged in and names in snake_case.
+    """
+    selections = collections.OrderedDict()
+
+    def collect(selection_set):
+        for selection in selection_set and selection_set.selections or []:
+            if isinstance(selection, ast.FragmentSpread):
+                collect(info.fragments[selection.name.value].selection_set)
+            elif isinstance(selection, ast.InlineFragment):
+                collect(selection.selection_set)
+            else:
+                name = to_snake_case(selection.name.value)
+                selections.setdefault(name, []).append(selection)
+
+    for field_ast in field_asts:
+        collect(field_ast.selection_set)
+    return selections
+
+
+def get_node_selections(info, field_asts):
+    # Connections select their node's fields under edges { node { ... } }
+    selections = collect_selections(info, field_asts)
+    if "edges" in selections:
+        edges = collect_selections(info, selections["edges"])
+        selections = collect_selections(info, edges.get("node", []))
+    return selections
+
+
+def is_filtered(field_asts):
+    return any(
+        argument.name.value not in PAGINATION_ARGS
+        for field_ast in field_asts
+        for argument in field_ast.arguments or []
+    )
+
+
+def trusts_related(related, user):
+    # Related rows can be joined in directly when the user may list all of them
+    return related.get_action_permission("list", user=user)[0] is True
+
+
+def plan_selections(resource, info, selections, user, required=()):
+    """
+    Returns (columns, select_related, prefetches) loading what selections ask
+    for from resource's model, where columns is None when every column is
+    needed, e.g. for computed properties.
+    """
+    columns = [resource.model._meta.pk.name] + list(required)
+    select_related, prefetches = [], []
+
+    for name, field_asts in selections.items():
+        if name in resource.property_map:
+            hints = resource.property_hints[name]
+            select_related += hints["select_related"]
+            prefetches += hints["prefetch_related"]
+            if hints["only"] is None:
+                columns = None
+            elif columns is not None:
+                columns += hints["only"]
+            continue
+        if name not in resource.gql_fields:
+            continue
+
+        field = resource.model_fields[name]
+        if not field.is_relation:
+            columns is not None and columns.append(name)
+            continue
+
+        related = resource.api.get_resource_for_model(field.related_model)
+        if field.many_to_one and field.concrete:
+            columns is not None and columns.append(name)
+            if not related or not trusts_related(related, user):
+                continue
+            sub_columns, sub_select, sub_prefetches = plan_selections(
+                related, info, collect_selections(info, field_asts), user
+            )
+            if sub_columns is None:
+                sub_columns = [f.name for f in related.model._meta.concrete_fields]
+            if columns is not None:
+                columns += ["%s__%s" % (name, column) for column in sub_columns]
+            select_related += [name] + ["%s__%s" % (name, s) for s in sub_select]
+        elif field.one_to_many and related and not is_filtered(field_asts):
+            qs, audit = related.get_permitted_queryset("list", user=user)
+            qs = optimize_queryset(
+                related,
+                qs,
+                info,
+                get_node_selections(info, field_asts),
+                user,
+                required=[field.field.name],
+            )
+            prefetches.append(Prefetch(field.get_accessor_name(), queryset=qs))
+
+    return columns, select_related, prefetches
+
+
+def optimize_queryset(resource, qs, info, selections, user, required=()):
+    """
+    Narrows qs to the columns, joins and prefetches the GraphQL selections
+    need. Relations it can't plan are left to the batched resolvers.
+    """
+    columns, select_related, prefetches = plan_selections(
+        resource, info, selections, user, required=required
+    )
+    if select_related:
+        qs = qs.select_related(*dict.fromkeys(select_related))
+    if prefetches:
+        qs = qs.prefetch_related(*prefetches)
+    if columns is not None:
+        qs = qs.only(*dict.fromkeys(columns))
+    return qs
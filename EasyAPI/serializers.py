@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.db.models.fields.reverse_related import ForeignObjectRel
 from rest_framework import serializers
 
@@ -10,9 +11,56 @@ class classproperty(object):
         return self.f(owner)
 
 
+class EasyPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A PrimaryKeyRelatedField that can be handed its related objects up front
+    by prefetch_related_pks, so validating many rows at once doesn't look up
+    each related object with its own query.
+    """
+
+    prefetched = None
+
+    def coerce_pk(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        return self.get_queryset().model._meta.pk.to_python(data)
+
+    def to_internal_value(self, data):
+        if self.prefetched is None:
+            return super(EasyPrimaryKeyRelatedField, self).to_internal_value(data)
+        try:
+            return self.prefetched[self.coerce_pk(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+def prefetch_related_pks(serializer, rows):
+    """
+    Fetch every object the rows refer to through serializer's writable
+    primary key relations, with one in_bulk query per relation.
+    """
+    for field in serializer.fields.values():
+        related = getattr(field, "child_relation", field)
+        if field.read_only or not isinstance(related, EasyPrimaryKeyRelatedField):
+            continue
+
+        pks = set()
+        for row in rows:
+            value = row.get(field.field_name)
+            for item in value if isinstance(value, list) else [value]:
+                try:
+                    pks.add(related.coerce_pk(item))
+                except (TypeError, ValueError, ValidationError):
+                    pass  # Reported by to_internal_value during validation
+        pks.discard(None)
+        related.prefetched = related.get_queryset().in_bulk(list(pks))
+
+
 class EasySerializable(object):
     @classmethod
-    def Assemble(cls, resource, primary_key="pk"):
+    def Assemble(cls, resource, primary_key="pk", only=None):
 
         # The Resource uses this serializer for both DRF and GQL
         # so we need to omit both PK and ID, and allow one ID to be added back in
@@ -20,11 +68,14 @@ class EasySerializable(object):
             f
             for f in resource.fields
             if f not in ["id", "pk"] + resource.reverse_relations
+            and (only is None or f in only)
         ]
         ALL = fields
         RO = resource.read_only
 
         class EasyBaseSerializer(cls, serializers.ModelSerializer):
+            serializer_related_field = EasyPrimaryKeyRelatedField
+
             class Meta:
                 model = resource.model
                 fields = ALL
@@ -2,13 +2,49 @@ from rest_framework import viewsets, status, exceptions
 from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter
 from rest_framework.decorators import action as action_decorator
-
+from rest_framework.permissions import BasePermission
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+
+from django.db import connections, router, transaction
+from django.db.models import (
+    Count,
+    Exists,
+    Max,
+    Model,
+    OuterRef,
+    prefetch_related_objects,
+)
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 
+from EasyAPI.aggregates import aggregate
+from EasyAPI.cache import invalidate_model
+from EasyAPI.jobs import get_job_backend
 from EasyAPI.metadata import EasyAPIMetadata
-from EasyAPI.serializers import classproperty
-
+from EasyAPI.renderers import CSVRenderer, NDJSONRenderer, csv_lines, ndjson_lines
+from EasyAPI.scope import remember_object, request_scope
+from EasyAPI.search import EasySearchFilter
+from EasyAPI.serializers import (
+    EasySerializable,
+    classproperty,
+    prefetch_related_pks,
+)
+
+import datetime
 import django.db.models
+import hashlib
+from calendar import timegm
+
+
+def http_timestamp(value):
+    # Seconds since the epoch for a DateTimeField or DateField value, with
+    # dates taken as midnight UTC
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time.min)
+    return timegm(value.utctimetuple())
 
 def create_action_view(resource, action, options):
     detail = options.get('detail', False)
@@ -27,18 +63,98 @@ def create_action_view(resource, action, options):
             target, audit = resource.get_permitted_queryset(action, user=request.user)
         method = getattr(resource.model, action)
         data = dict(**{k: v for k, v in request.GET.items()}, **request.data, request=request)
-        return Response({
-                    'result': resource.api.serialize(
-                        method(target, **data, **kwargs))
-                })
+        run = lambda: resource.api.serialize(method(target, **data, **kwargs))
+
+        if options.get('background'):
+            user = request.user.is_authenticated and request.user or None
+            job = get_job_backend().submit(action, run, user=user)
+            return Response(
+                dict(job.as_dict(), url=view_self.reverse_action(
+                    'job-status', kwargs={'job_id': job.id})),
+                status=status.HTTP_202_ACCEPTED,
+            )
+        return Response({'result': run()})
 
     action_view.__name__ = action
     return wrapper(action_view)
 
+def create_job_status_view():
+    wrapper = action_decorator(detail=False,
+            name='job_status',
+            methods=['GET'],
+            url_path=r'jobs/(?P<job_id>[0-9a-f]+)',
+            url_name='job-status'
+    )
+    def job_status(view_self, request, job_id=None, **kwargs):
+        # Jobs are only visible to whoever started them
+        user = request.user.is_authenticated and request.user or None
+        job = get_job_backend().get(job_id)
+        if job is None or job.user_id != (user and user.pk):
+            raise Http404
+        return Response(job.as_dict())
+
+    job_status.__name__ = 'job_status'
+    return wrapper(job_status)
+
+def can_bulk_insert(model, rows):
+    """
+    bulk_create skips save() and signals, can't set many to many relations
+    and only fills in primary keys on databases that return them, so it's
+    only used when none of that matters.
+    """
+    features = connections[router.db_for_write(model)].features
+    returns_pks = getattr(
+        features,
+        "can_return_rows_from_bulk_insert",
+        getattr(features, "can_return_ids_from_bulk_insert", False),
+    )
+    many_to_many = [f.name for f in model._meta.many_to_many]
+    return (
+        returns_pks
+        and model.save is Model.save
+        and not model._meta.parents
+        and not any(name in row for row in rows for name in many_to_many)
+    )
+
+
+def create_upsert_view():
+    wrapper = action_decorator(
+        detail=False, name="upsert", methods=["POST"], url_path="upsert"
+    )
+
+    def upsert(view_self, request, **kwargs):
+        return view_self.upsert_rows(request)
+
+    upsert.__name__ = "upsert"
+    return wrapper(upsert)
+
+
+class RowRequest(object):
+    # The request as the create hooks see it for one row of a bulk create
+    def __init__(self, request, data):
+        self.bulk_request = request
+        self.data = data
+
+    def __getattr__(self, attr):
+        return getattr(self.bulk_request, attr)
+
+
 class EasyViewSet(viewsets.ModelViewSet):
     metadata_class = EasyAPIMetadata
-    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    filter_backends = (DjangoFilterBackend, OrderingFilter, EasySearchFilter)
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [
+        CSVRenderer,
+        NDJSONRenderer,
+    ]
     permissions = None
+    # Bulk actions are permitted (and scoped) like their single object versions
+    permission_actions = {
+        "bulk_update": "update",
+        "bulk_destroy": "destroy",
+        "upsert": "update",
+        "job_status": "list",
+        "aggregate": "list",
+    }
 
     @classmethod
     def Assemble(cls, resource, **kwargs):
@@ -49,6 +165,10 @@ class EasyViewSet(viewsets.ModelViewSet):
 
         for action, options in resource.actions.items():
             extra_views[action] = create_action_view(resource, action, options)
+        if any(options.get("background") for options in resource.actions.values()):
+            extra_views["job_status"] = create_job_status_view()
+        if resource.natural_key:
+            extra_views["upsert"] = create_upsert_view()
         
         klass = type(
             "%sViewSet" % model._meta.object_name,
@@ -71,8 +191,37 @@ class EasyViewSet(viewsets.ModelViewSet):
         return self.model._meta.app_label
 
     def get_serializer_class(self):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            return self.resource.get_sparse_serializer(fields)
         return self.resource.serializer_class
 
+    def get_requested_fields(self):
+        """
+        The sparse fieldset asked for with ?fields=a,b,c on list and retrieve,
+        or None to render every field.
+        """
+        if hasattr(self, "_requested_fields"):
+            return self._requested_fields
+
+        self._requested_fields = None
+        param = self.request.query_params.get("fields")
+        if (
+            param is None
+            or self.action not in ["list", "retrieve"]
+            or not issubclass(self.resource.serializer_class, EasySerializable)
+        ):
+            return None
+
+        fields = [f.strip() for f in param.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in self.resource.readable_fields + ["pk"]]
+        if unknown:
+            raise exceptions.ValidationError(
+                {"fields": ["Unknown fields: %s" % ", ".join(unknown)]}
+            )
+        self._requested_fields = fields
+        return fields
+
     @classmethod
     def view_save_data(cls, view, request):
         return {k: v for k, v in request.data.items()}
@@ -89,6 +238,20 @@ class EasyViewSet(viewsets.ModelViewSet):
     def view_perform_create(cls, view, serializer):
         return cls.view_perform_save(view, serializer)
 
+    @classmethod
+    def view_perform_bulk_create(cls, view, serializer):
+        model = view.resource.model
+        rows = serializer.validated_data
+        with transaction.atomic(using=router.db_for_write(model)):
+            if not can_bulk_insert(model, rows):
+                return serializer.save()
+            instances = model._default_manager.bulk_create(
+                [model(**row) for row in rows]
+            )
+        serializer.instance = instances
+        invalidate_model(model)
+        return instances
+
     @classmethod
     def view_update_data(cls, view, request):
         return cls.view_save_data(view, request)
@@ -97,14 +260,28 @@ class EasyViewSet(viewsets.ModelViewSet):
     def view_perform_update(cls, view, serializer):
         return cls.view_perform_save(view, serializer)
 
-    def add_default_data(self, data):
+    def get_default_data(self, data):
+        """
+        Values from the model's get_default_<field>(resource, request, data)
+        hooks. data is the request body: one object for a single create, and
+        the whole list for bulk creates and upserts, whose hooks are called
+        once and their values applied to every row.
+        """
+        defaults = {}
         for name in set(self.resource.fields):
             func = getattr(self.resource.model, 'get_default_%s'%name, None)
             if func:
-                data[name] = func(self.resource, self.request, data)
+                defaults[name] = func(self.resource, self.request, data)
+        return defaults
+
+    def add_default_data(self, data):
+        data.update(self.get_default_data(data))
         return data
 
     def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+
         data = self.view_create_data(self, request)
         with_defaults = self.add_default_data(data)
         serializer = self.get_serializer(data=with_defaults)
@@ -115,6 +292,276 @@ class EasyViewSet(viewsets.ModelViewSet):
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
 
+    def bulk_create(self, request):
+        """
+        Create every row of a JSON array in one transaction. The get_default_*
+        hooks are called once for the whole batch (with the list as data), and
+        related primary keys are checked with one query per relation. Viewsets
+        overriding the create hooks get bulk_create_rows instead.
+        """
+        if not all(isinstance(row, dict) for row in request.data):
+            raise exceptions.ValidationError("Expected a list of objects")
+        self.check_bulk_rows(len(request.data))
+        defaults = self.get_default_data(request.data)
+        if self.overrides_create_hooks():
+            return self.bulk_create_rows(request, defaults)
+        rows = [dict(row, **defaults) for row in request.data]
+
+        serializer = self.get_serializer(data=rows, many=True)
+        prefetch_related_pks(serializer.child, rows)
+        serializer.is_valid(raise_exception=True)
+        self.perform_bulk_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def overrides_create_hooks(self):
+        return any(
+            getattr(type(self), name).__func__ is not getattr(EasyViewSet, name).__func__
+            for name in [
+                "view_save_data",
+                "view_create_data",
+                "view_perform_save",
+                "view_perform_create",
+            ]
+        )
+
+    def bulk_create_rows(self, request, defaults):
+        """
+        bulk_create for viewsets overriding the single object create hooks,
+        which see one row at a time: each row is passed to view_create_data
+        (as the data of a RowRequest) and saved by perform_create,
+        still in one transaction and only once every row is valid.
+        """
+        serializers = []
+        for row in request.data:
+            data = self.view_create_data(self, RowRequest(request, row))
+            data = dict(data, **defaults)
+            serializers.append(self.get_serializer(data=data))
+        valid = [serializer.is_valid() for serializer in serializers]
+        if not all(valid):
+            raise exceptions.ValidationError(
+                [serializer.errors for serializer in serializers]
+            )
+
+        with transaction.atomic(using=router.db_for_write(self.resource.model)):
+            for serializer in serializers:
+                self.perform_create(serializer)
+        return Response(
+            [serializer.data for serializer in serializers],
+            status=status.HTTP_201_CREATED,
+        )
+
+    def check_bulk_rows(self, count):
+        limit = self.resource.bulk_max_rows
+        if limit is not None and count > limit:
+            raise exceptions.ValidationError(
+                "This would affect %s rows, the limit is %s" % (count, limit)
+            )
+
+    def is_dry_run(self):
+        return self.request.query_params.get("dry_run") in ["true", "1"]
+
+    def get_bulk_queryset(self):
+        # The permitted queryset narrowed by the request's filters, without the
+        # select_related/prefetch/only() that get_queryset adds for reading
+        user = self.request.user.is_authenticated and self.request.user or None
+        qs, audit = self.resource.get_permitted_queryset(
+            self.get_permission_action(), user=user
+        )
+        return self.filter_queryset(qs)
+
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Apply the body's values to every permitted row matching the filters
+        with a single UPDATE. Like queryset.update(), this skips save() and
+        signals. ?dry_run=true only reports how many rows would change.
+        """
+        serializer = self.get_serializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        values = serializer.validated_data
+        many_to_many = [
+            f.name for f in self.resource.model._meta.many_to_many if f.name in values
+        ]
+        if many_to_many:
+            raise exceptions.ValidationError(
+                {name: ["Can't be bulk updated"] for name in many_to_many}
+            )
+
+        model = self.resource.model
+        with transaction.atomic(using=router.db_for_write(model)):
+            queryset = self.get_bulk_queryset()
+            count = queryset.count()
+            self.check_bulk_rows(count)
+            if self.is_dry_run() or not values:
+                return Response({"count": count, "dry_run": self.is_dry_run()})
+            count = queryset.update(**values)
+        invalidate_model(model)
+        return Response({"count": count, "dry_run": False})
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        """
+        Delete every permitted row matching the filters with queryset.delete().
+        ?dry_run=true only reports how many rows would be deleted.
+        """
+        model = self.resource.model
+        with transaction.atomic(using=router.db_for_write(model)):
+            queryset = self.get_bulk_queryset()
+            count = queryset.count()
+            self.check_bulk_rows(count)
+            if not self.is_dry_run():
+                total, deleted = queryset.delete()
+                count = deleted.get(model._meta.label, 0)
+        return Response({"count": count, "dry_run": self.is_dry_run()})
+
+    def get_natural_key(self, values):
+        return tuple(
+            getattr(values.get(name), "pk", values.get(name))
+            for name in self.resource.natural_key
+        )
+
+    def upsert_rows(self, request):
+        """
+        Create or update every row of a JSON array, matching existing rows on
+        the resource's natural_key. Existing rows are loaded with one query,
+        then changed rows go through bulk_update and new ones through
+        bulk_create, batch_size rows at a time. Keys matching rows outside the
+        permitted queryset are refused rather than created again.
+        """
+        user = request.user.is_authenticated and request.user or None
+        permission, audit = self.resource.get_action_permission("create", user=user)
+        if not permission:
+            raise exceptions.MethodNotAllowed(self.action)
+        if not isinstance(request.data, list) or not all(
+            isinstance(row, dict) for row in request.data
+        ):
+            raise exceptions.ValidationError("Expected a list of objects")
+        self.check_bulk_rows(len(request.data))
+
+        natural_key = self.resource.natural_key
+        missing = [
+            i for i, row in enumerate(request.data) if not set(natural_key) <= set(row)
+        ]
+        if missing:
+            raise exceptions.ValidationError(
+                "Rows %s are missing %s" % (missing, ", ".join(natural_key))
+            )
+
+        defaults = self.get_default_data(request.data)
+        rows = [dict(row, **defaults) for row in request.data]
+        serializer = self.get_serializer(data=rows, many=True)
+        # Rows are matched on the natural key rather than rejected as duplicates
+        serializer.child.validators = []
+        for name in natural_key:
+            serializer.child.fields[name].validators = [
+                v for v in serializer.child.fields[name].validators
+                if not isinstance(v, UniqueValidator)
+            ]
+        prefetch_related_pks(serializer.child, rows)
+        serializer.is_valid(raise_exception=True)
+
+        model = self.resource.model
+        values = serializer.validated_data
+        many_to_many = [
+            f.name for f in model._meta.many_to_many
+            if any(f.name in row for row in values)
+        ]
+        if many_to_many:
+            raise exceptions.ValidationError(
+                {name: ["Can't be upserted"] for name in many_to_many}
+            )
+        keys = [self.get_natural_key(row) for row in values]
+        if len(set(keys)) != len(keys):
+            raise exceptions.ValidationError("Rows repeat a natural key")
+
+        permitted = self.get_bulk_queryset().filter(pk=OuterRef("pk"))
+        queryset = (
+            model._default_manager.filter(
+                **{
+                    "%s__in" % name: set(key[i] for key in keys)
+                    for i, name in enumerate(natural_key)
+                }
+            )
+            .annotate(upsert_permitted=Exists(permitted))
+        )
+        attnames = [model._meta.get_field(name).attname for name in natural_key]
+        existing = {
+            tuple(getattr(obj, attname) for attname in attnames): obj
+            for obj in queryset
+        }
+        forbidden = [
+            i for i, key in enumerate(keys)
+            if key in existing and not existing[key].upsert_permitted
+        ]
+        if forbidden:
+            raise exceptions.PermissionDenied(
+                "Rows %s match rows you can't update" % forbidden
+            )
+
+        created, changed, changed_fields = [], [], set()
+        for key, row in zip(keys, values):
+            obj = existing.get(key)
+            if obj is None:
+                created.append(model(**row))
+                continue
+            fields = [
+                name for name, value in row.items()
+                if getattr(obj, model._meta.get_field(name).attname)
+                != getattr(value, "pk", value)
+            ]
+            for name in fields:
+                setattr(obj, name, row[name])
+            if fields:
+                changed.append(obj)
+                changed_fields.update(fields)
+
+        if not self.is_dry_run():
+            self.perform_upsert(created, changed, list(changed_fields))
+        return Response(
+            {
+                "created": len(created),
+                "updated": len(changed),
+                "unchanged": len(values) - len(created) - len(changed),
+                "dry_run": self.is_dry_run(),
+            }
+        )
+
+    def perform_upsert(self, created, changed, fields):
+        model = self.resource.model
+        manager = model._default_manager
+        batch_size = self.resource.bulk_batch_size
+        with transaction.atomic(using=router.db_for_write(model)):
+            if model.save is not Model.save:
+                # Don't skip the model's own save()
+                for obj in created + changed:
+                    obj.save()
+                return
+            manager.bulk_create(created, batch_size=batch_size)
+            if changed:
+                manager.bulk_update(changed, fields, batch_size=batch_size)
+        invalidate_model(model)
+
+    @action_decorator(detail=False, methods=["GET"], url_path="aggregate")
+    def aggregate(self, request, *args, **kwargs):
+        """
+        Group the permitted, filtered rows with ?group_by=field,date_field:month
+        and compute ?aggregate=sum:field,avg:field,count in SQL.
+        """
+        specs = lambda name: [
+            spec.strip()
+            for param in request.query_params.getlist(name)
+            for spec in param.split(",")
+            if spec.strip()
+        ]
+        user = request.user.is_authenticated and request.user or None
+        return Response(
+            aggregate(
+                self.resource,
+                self.get_bulk_queryset(),
+                group_by=specs("group_by"),
+                aggregates=specs("aggregate"),
+                user=user,
+            )
+        )
+
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop("partial", False)
         data = self.view_update_data(self, request)
@@ -142,6 +589,15 @@ class EasyViewSet(viewsets.ModelViewSet):
         except (ValidationError) as e:
             raise serializers.ValidationError(getattr(e, "message", str(e)))
 
+    def perform_bulk_create(self, serializer):
+        from django.core.exceptions import ValidationError
+        from rest_framework import serializers
+
+        try:
+            return self.view_perform_bulk_create(self, serializer)
+        except (ValidationError) as e:
+            raise serializers.ValidationError(getattr(e, "message", str(e)))
+
     def perform_update(self, serializer):
         from django.core.exceptions import ValidationError
         from rest_framework import serializers
@@ -152,31 +608,273 @@ class EasyViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError(getattr(e, "message", str(e)))
 
     def list(self, request, *args, **kwargs):
+        cached = self.get_cached_response()
+        if cached is not None:
+            return cached
+
         queryset = self.filter_queryset(self.get_queryset())
-        as_csv = request.GET.get("format") == "csv"
+        not_modified = self.check_not_modified(queryset)
+        if not_modified:
+            return not_modified
+
+        if request.GET.get("format") == "csv":
+            return self.stream_csv(request, queryset)
+        if request.GET.get("format") == "ndjson":
+            return self.stream_ndjson(request, queryset)
+
         all_rows = request.GET.get("all_rows") == "true"
 
-        page = self.paginate_queryset(queryset)
+        converter = self.get_row_converter()
+        rows = queryset.values(*converter.columns) if converter else queryset
+
+        page = self.paginate_queryset(rows)
 
         if not all_rows and page is not None:
-            serializer = self.get_serializer(page, many=True)
-            resp = self.get_paginated_response(serializer.data)
+            resp = self.get_paginated_response(self.serialize_rows(page, converter))
         else:
-            serializer = self.get_serializer(queryset, many=True)
-            resp = Response(serializer.data)
-
-        if as_csv:
-            fn = request.GET.get("filename", self.model.plural + ".csv")
-            dispo = 'attachment; filename="%s"' % fn
-            resp["Content-Disposition"] = dispo
-            resp["Content-Type"] = "text/csv; charset=utf-8"
-        resp["Count"] = queryset.count()
+            resp = Response(self.serialize_rows(rows, converter))
+
+        if getattr(self.paginator, "count_rows", True):
+            resp["Count"] = queryset.count()
         return resp
 
+    def retrieve(self, request, *args, **kwargs):
+        cached = self.get_cached_response()
+        if cached is not None:
+            return cached
+
+        queryset = self.filter_lookup(self.filter_queryset(self.get_queryset()))
+        not_modified = self.check_not_modified(queryset)
+        if not_modified:
+            return not_modified
+
+        converter = self.get_row_converter()
+        if converter is None:
+            return super(EasyViewSet, self).retrieve(request, *args, **kwargs)
+
+        row = queryset.values(*converter.columns).first()
+        if row is None:
+            raise Http404
+        return Response(converter(row))
+
+    def filter_lookup(self, queryset):
+        # A malformed pk is a 404, like get_object_or_404 makes it
+        from django.core.exceptions import ValidationError
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+
+    def get_validators(self, queryset):
+        """
+        An ETag and Last-Modified timestamp for a read, from one aggregate over
+        the resource's last_modified_field instead of rendering the response.
+        The ETag is weak, as it identifies the rows rather than the exact bytes.
+        """
+        field = self.resource.last_modified_field
+        if not field or not self.resource.conditional_get:
+            return None, None
+
+        stats = queryset.order_by().aggregate(
+            last_modified=Max(field), count=Count("pk")
+        )
+        last_modified = stats["last_modified"]
+        user = self.request.user.is_authenticated and self.request.user or None
+        key = [
+            self.resource.api.name,
+            self.resource.label,
+            self.action,
+            user and user.pk,
+            self.request.get_full_path(),
+            self.request.META.get("HTTP_ACCEPT", ""),
+            last_modified and last_modified.isoformat(),
+            stats["count"],
+        ]
+        etag = hashlib.sha1("|".join(str(k) for k in key).encode("utf-8"))
+        return (
+            "W/%s" % quote_etag(etag.hexdigest()),
+            last_modified and http_timestamp(last_modified),
+        )
+
+    def check_not_modified(self, queryset):
+        self.validators = self.get_validators(queryset)
+        etag, last_modified = self.validators
+        if etag is None:
+            return None
+        return get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+
+    def set_validators(self, request, response):
+        etag, last_modified = getattr(self, "validators", (None, None))
+        if etag:
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+            return response
+
+        # Without a declared last_modified_field the ETag is a hash of the
+        # body, which saves the client the transfer but not us the render
+        if (
+            not self.resource.conditional_get
+            or self.action not in ["list", "retrieve"]
+            or not isinstance(response, Response)
+            or response.status_code != status.HTTP_200_OK
+        ):
+            return response
+        response.render()
+        response["ETag"] = quote_etag(hashlib.sha256(response.content).hexdigest())
+        return get_conditional_response(
+            request, etag=response["ETag"], response=response
+        )
+
+    def get_cached_response(self):
+        cache = self.resource.response_cache
+        self.cache_key = None
+        if cache is None or self.request.method != "GET":
+            return None
+
+        user = self.request.user.is_authenticated and self.request.user or None
+        key = cache.get_key(self.request, self.action, user, self.kwargs)
+        response = cache.get(key)
+        if response is None:
+            self.cache_key = key
+            return None
+        return get_conditional_response(
+            self.request,
+            etag=response.get("ETag"),
+            last_modified=parse_http_date_safe(response.get("Last-Modified", "")),
+            response=response,
+        )
+
+    def cache_response(self, response):
+        if (
+            not getattr(self, "cache_key", None)
+            or not isinstance(response, Response)
+            or response.status_code != status.HTTP_200_OK
+            or response.accepted_renderer.format == "api"
+        ):
+            return
+        if not response.is_rendered:
+            response.render()
+        self.resource.response_cache.set(self.cache_key, response)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(EasyViewSet, self).finalize_response(
+            request, response, *args, **kwargs
+        )
+        if request.method not in ["GET", "HEAD"]:
+            return response
+        response = self.set_validators(request, response)
+        self.cache_response(response)
+        return response
+
+    def checks_object_permissions(self):
+        return any(
+            type(permission).has_object_permission
+            is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def get_row_converter(self):
+        """
+        Reads that only need plain columns skip model instances and the
+        serializer, and are served from queryset.values() instead.
+        """
+        if self.action not in ["list", "retrieve"]:
+            return None
+        needs_instances = getattr(self.paginator, "needs_instances", False)
+        if self.action == "list" and needs_instances:
+            return None
+        if self.action == "retrieve" and self.checks_object_permissions():
+            return None
+        return self.resource.get_row_converter(self.get_serializer_class())
+
+    def serialize_rows(self, rows, converter=None):
+        if converter:
+            return converter.convert_all(rows)
+        return self.get_serializer(rows, many=True).data
+
+    def serialize_chunk(self, chunk, prefetches):
+        prefetch_related_objects(chunk, *prefetches)
+        return self.get_serializer(chunk, many=True).data
+
+    def iter_serialized(self, queryset):
+        """
+        Serialize a queryset a chunk at a time, so memory stays flat no matter
+        how many rows are exported. iterator() skips prefetch_related, so the
+        resource's prefetches are run again for each chunk.
+        """
+        user = self.request.user.is_authenticated and self.request.user or None
+        prefetches = self.resource.get_prefetches(
+            user=user, fields=self.get_requested_fields()
+        )
+        chunk_size = self.resource.stream_chunk_size
+
+        converter = self.resource.get_row_converter(self.get_serializer_class())
+        if converter:
+            rows = queryset.values(*converter.columns)
+            for row in rows.iterator(chunk_size=chunk_size):
+                yield converter(row)
+            return
+
+        chunk = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(obj)
+            if len(chunk) >= chunk_size:
+                yield from self.serialize_chunk(chunk, prefetches)
+                chunk = []
+        if chunk:
+            yield from self.serialize_chunk(chunk, prefetches)
+
+    def stream_csv(self, request, queryset):
+        header = [
+            name
+            for name, field in self.get_serializer().fields.items()
+            if not field.write_only
+        ]
+        resp = StreamingHttpResponse(
+            csv_lines(header, self.iter_serialized(queryset)),
+            content_type="text/csv; charset=utf-8",
+        )
+        fn = request.GET.get("filename", self.resource.label + ".csv")
+        resp["Content-Disposition"] = 'attachment; filename="%s"' % fn
+        return resp
+
+    def stream_ndjson(self, request, queryset):
+        return StreamingHttpResponse(
+            ndjson_lines(self.iter_serialized(queryset)),
+            content_type="application/x-ndjson; charset=utf-8",
+        )
+
+    def get_permission_action(self):
+        return self.permission_actions.get(self.action, self.action)
+
+    def dispatch(self, request, *args, **kwargs):
+        with request_scope():
+            return super(EasyViewSet, self).dispatch(request, *args, **kwargs)
+
+    def get_object(self):
+        # Found once per request, then served from the request's identity map
+        user = self.request.user.is_authenticated and self.request.user or None
+        return remember_object(
+            self.resource,
+            self.get_permission_action(),
+            user,
+            self.kwargs[self.lookup_url_kwarg or self.lookup_field],
+            super(EasyViewSet, self).get_object,
+        )
+
     def check_permissions(self, request):
         parent_permitted = super(EasyViewSet, self).check_permissions(request)
         user = self.request.user.is_authenticated and self.request.user or None
-        permission, audit = self.resource.get_action_permission(self.action, user=user)
+        permission, audit = self.resource.get_action_permission(
+            self.get_permission_action(), user=user
+        )
 
         if permission:
             return parent_permitted
@@ -188,7 +886,10 @@ class EasyViewSet(viewsets.ModelViewSet):
         user = self.request.user.is_authenticated and self.request.user or None
         qs, audit = self.resource.get_permitted_queryset(self.action, user=user)
 
-        return qs
+        fields = self.get_requested_fields()
+        if fields is not None:
+            qs = self.resource.get_sparse_queryset(qs, fields)
+        return self.resource.apply_query_plan(qs, user=user, fields=fields)
 
     def get_permissions(self):
         permission_classes = self.permissions + []
@@ -0,0 +1,44 @@
+import itertools
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    sys.path.insert(0, ROOT)
+    os.environ["DJANGO_SETTINGS_MODULE"] = "example.app.settings"
+
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def create_widgets(count):
+    from example.app.widgets.models import Store, Widget, default_store_id
+    from example.app.widgets.options import COLORS, SHAPES, SIZES
+
+    store_id = default_store_id()
+    options = itertools.cycle(itertools.product(COLORS, SIZES, SHAPES))
+    for i in range(count):
+        color, size, shape = next(options)
+        Widget.objects.create(
+            color=color[0], size=size[0], shape=shape[0], store_id=store_id
+        )
+    return Store.objects.get(pk=store_id)
+
+
+def best_of(func, number=10, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def report(name, seconds, baseline=None):
+    line = "%-40s %9.3f ms" % (name, seconds * 1000)
+    if baseline:
+        line += "   %.2fx" % (baseline / seconds)
+    print(line)
@@ -0,0 +1,40 @@
+"""
+DRF ModelSerializer vs the generated serializer function used by compiled
+resources, for the PrivateAPI Widget resource.
+
+    python benchmarks/compiled_serializer.py [rows]
+"""
+import sys
+
+from common import best_of, report, setup_django
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+
+def main():
+    setup_django()
+
+    from common import create_widgets
+    from example.app.api import privateapi
+    from example.app.widgets.models import Widget
+
+    create_widgets(ROWS)
+    compiled = privateapi.get_resource_for_model(Widget).serializer_class
+    widgets = list(Widget.objects.all())
+
+    def serialize():
+        return compiled.compiled_from(widgets, many=True).data
+
+    def compiled_serialize():
+        return compiled(widgets, many=True).data
+
+    assert serialize() == compiled_serialize()
+
+    print("%s widgets already loaded" % ROWS)
+    slow = best_of(serialize)
+    report("ModelSerializer(many=True)", slow)
+    report("compiled serializer(many=True)", best_of(compiled_serialize), slow)
+
+
+if __name__ == "__main__":
+    main()
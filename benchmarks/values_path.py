@@ -0,0 +1,61 @@
+"""
+Serializer vs values() fast path for the AdminAPI Widget resource.
+
+    python benchmarks/values_path.py [rows]
+"""
+import sys
+
+from common import best_of, report, setup_django
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+
+def main():
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+
+    from common import create_widgets
+    from example.app.api import complexapi
+    from example.app.widgets.models import Widget
+
+    create_widgets(ROWS)
+    get_user_model().objects.create_superuser("bench", "bench@test.co", "bench")
+    client = APIClient()
+    client.login(username="bench", password="bench")
+
+    resource = complexapi.get_resource_for_model(Widget)
+    converter = resource.get_row_converter(resource.serializer_class)
+    queryset = Widget.objects.all()
+
+    def serialize():
+        return resource.serializer_class(queryset.all(), many=True).data
+
+    def convert():
+        return converter.convert_all(queryset.values(*converter.columns))
+
+    assert [dict(row) for row in serialize()] == convert()
+
+    print("%s widgets, %s columns" % (ROWS, len(converter.columns)))
+    slow = best_of(serialize)
+    report("ModelSerializer(many=True)", slow)
+    report("values() + row converter", best_of(convert), slow)
+
+    def get_list():
+        response = client.get("/complexapi/widgets/")
+        assert response.status_code == 200
+        return response.content
+
+    resource.values_fast_path = False
+    slow_body = get_list()
+    slow = best_of(get_list, number=3)
+    report("GET /complexapi/widgets/ (serializer)", slow)
+
+    resource.values_fast_path = True
+    assert get_list() == slow_body
+    report("GET /complexapi/widgets/ (values)", best_of(get_list, number=3), slow)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,8 @@ publicapi = EasyAPI('PublicAPI',
 privateapi = EasyAPI('PrivateAPI',
                      permissions.IsAuthenticated,
                      'API for logged in users',
-                     permission_context='store_owner'
+                     permission_context='store_owner',
+                     compiled=True,
                      )
 
 complexapi = EasyAPI('AdminAPI',
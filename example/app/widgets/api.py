@@ -1,5 +1,6 @@
 from .models import Widget, Purchase, Customer, Store, User
 from example.app.api import publicapi, privateapi, complexapi
+from EasyAPI.pagination import KeysetPagination
 
 # Stores: Read All, Write Owner
 #  | Widgets: Read All, Write Store Owner
@@ -7,19 +8,19 @@ from example.app.api import publicapi, privateapi, complexapi
 #  | Customers: Read Store Owner
 #    | Purchases: Read Store Owner
 
-publicapi.register(Widget, fields=['name', 'color', 'store'])
-privateapi.register(Widget, fields=['name', 'color', 'size', 'shape', 'cost', 'store', 'created_at', 'archived_at'], dump_info=True)
-complexapi.register(Widget, list_display=['name', 'color', 'size', 'shape', 'cost', 'age', 'created_at', 'archived_at'])
+publicapi.register(Widget, fields=['name', 'color', 'store'], search_fields=['name', 'color'])
+privateapi.register(Widget, fields=['name', 'color', 'size', 'shape', 'cost', 'store', 'created_at', 'archived_at', 'stub'], bulk_actions=True, dump_info=True)
+complexapi.register(Widget, list_display=['name', 'color', 'size', 'shape', 'cost', 'age', 'created_at', 'archived_at'], bulk_actions=True)
 
 publicapi.register(Purchase, fields=['items', 'sale_price'])
 privateapi.register(Purchase, fields=['items', 'sale_price', 'sale_date', 'profit', 'customer'], inlines=['items'])
-complexapi.register(Purchase, inlines=['items'])
+complexapi.register(Purchase, inlines=['items'], pagination_class=KeysetPagination)
 
 publicapi.register(Customer, fields=['name', 'age'])
 privateapi.register(Customer, fields=['name', 'state', 'gender', 'age'])
-complexapi.register(Customer)
+complexapi.register(Customer, natural_key=['store', 'name'])
 
-publicapi.register(Store, fields=['name'], inlines=['widgets'])
+publicapi.register(Store, fields=['name'], inlines=['widgets'], cache_alias='default')
 privateapi.register(Store, inlines=['widgets'], dump_info=True)
 complexapi.register(Store, inlines=['widgets'])
 
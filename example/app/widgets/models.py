@@ -70,7 +70,10 @@ class Widget(models.Model):
     def age(self):
         return (django.utils.timezone.now() - self.created_at).total_seconds()
 
-    @APIProperty(graphene.String)
+    # Hints let list querysets join the store in instead of fetching it per row
+    @APIProperty(
+        graphene.String, select_related=["store"], only=["name", "store__name"]
+    )
     def stub(self):
         return "%s-%s" % (self.store.name, self.name)
 
@@ -88,6 +91,12 @@ class Widget(models.Model):
     def top_three(cls, qs, **data):
         return qs.annotate(sold=models.Sum('items__purchase__sale_price')).order_by('sold')[:3]
 
+    @APIAction(many=True, read_only=True, background=True)
+    @classmethod
+    def color_report(cls, qs, **data):
+        counts = qs.order_by().values('color').annotate(count=models.Count('pk'))
+        return {row['color']: row['count'] for row in counts}
+
     unarchived = django_filters.BooleanFilter(field_name='archived_at', lookup_expr='isnull')
     archived = django_filters.BooleanFilter(field_name='archived_at', lookup_expr='isnull', exclude=True)
 
@@ -1,9 +1,12 @@
 import itertools
+import json
 from rest_framework import status
 from example.app.widgets.models import Widget, Store, default_store_id
 from example.app.widgets.options import COLORS, SIZES, SHAPES
 from example.tests.factories import PurchaseFactory
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase, APIClient
 from unittest import skip
 
@@ -68,6 +71,69 @@ class PublicAPITest(APITestCase):
         self.assertEqual(len(widgets.data[rand_index]), len(widget_fields))
         [self.assertIn(field, widgets.data[rand_index]) for field in widget_fields]
 
+    def test_public_widgets_csv(self):
+        from example.app.api import publicapi
+
+        resource = publicapi.get_resource_for_model(Widget)
+        chunk_size = resource.stream_chunk_size
+        resource.stream_chunk_size = 50
+        try:
+            response = self.client.get("/publicapi/widgets/?format=csv")
+            # The content is produced lazily, so it's read at this chunk size
+            lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        finally:
+            resource.stream_chunk_size = chunk_size
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="widgets.csv"', response["Content-Disposition"])
+        self.assertEqual(lines[0], "pk,name,color,store")
+        self.assertEqual(len(lines), Widget.objects.count() + 1)
+
+        red = self.client.get("/publicapi/widgets/?format=csv&color=red")
+        lines = b"".join(red.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual(len(lines), Widget.objects.filter(color="red").count() + 1)
+
+    def test_csv_chunks(self):
+        from example.app.api import complexapi
+
+        self.client.force_authenticate(
+            User.objects.create_superuser("chunks", "chunks@test.co", "chunks123")
+        )
+        User.objects.bulk_create(User(username="chunk%s" % i) for i in range(120))
+        resource = complexapi.get_resource_for_model(User)
+        chunk_size = resource.stream_chunk_size
+        resource.stream_chunk_size = 50
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get("/complexapi/users/?format=csv")
+                lines = b"".join(response.streaming_content).decode("utf-8")
+        finally:
+            resource.stream_chunk_size = chunk_size
+        self.assertEqual(len(lines.splitlines()), User.objects.count() + 1)
+
+        # Each chunk of 50 users prefetches its own groups
+        group_queries = [
+            q for q in queries
+            if q["sql"].startswith("SELECT") and '"auth_group"' in q["sql"]
+        ]
+        self.assertEqual(len(group_queries), -(-User.objects.count() // 50))
+        self.assertGreater(len(group_queries), 1)
+
+    def test_public_widgets_ndjson(self):
+        response = self.client.get("/publicapi/widgets/?format=ndjson&ordering=-id")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+
+        body = b"".join(response.streaming_content).decode("utf-8")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), Widget.objects.count())
+        full = self.client.get("/publicapi/widgets/?all_rows=true&ordering=-id")
+        self.assertEqual(rows, full.json())
+
     def test_public_get_purchases(self):
         purchases = self.client.get("/publicapi/purchases/")
         self.assertEqual(purchases.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
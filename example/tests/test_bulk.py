@@ -0,0 +1,413 @@
+from contextlib import ExitStack
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import permissions, status
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    APITestCase,
+    force_authenticate,
+)
+
+from EasyAPI.api import EasyAPI, all_apis
+
+from EasyAPI.resources import ModelResource
+from EasyAPI.views import EasyViewSet, can_bulk_insert
+from example.app.api import complexapi
+from example.app.widgets.models import Customer, Store, Widget
+
+User = get_user_model()
+
+SUPER = {"username": "testsuper", "email": "super@test.co", "password": "super123"}
+
+
+class BulkCreateTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.client.login(username=SUPER["username"], password=SUPER["password"])
+        self.stores = [
+            Store.objects.create(name="store %s" % i, owner=self.suser)
+            for i in range(3)
+        ]
+
+    def widget_rows(self, count):
+        return [
+            {
+                "name": "bulk %s" % i,
+                "color": "red",
+                "size": "small",
+                "shape": "circle",
+                "store": self.stores[i % len(self.stores)].pk,
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        before = Widget.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/complexapi/widgets/", self.widget_rows(9), format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 9)
+        self.assertEqual(Widget.objects.count(), before + 9)
+        self.assertTrue(all(row["pk"] for row in response.data))
+
+        # Widget overrides save(), so rows are saved one by one, but the
+        # stores are still checked with a single query
+        store_lookups = [
+            q for q in queries if q["sql"].startswith("SELECT")
+            and '"widgets_store"' in q["sql"]
+        ]
+        self.assertEqual(len(store_lookups), 1)
+
+        # save() still ran for every row
+        widget = Widget.objects.get(pk=response.data[0]["pk"])
+        self.assertNotEqual(widget.cost, 0)
+
+    def test_invalid_row_creates_nothing(self):
+        rows = self.widget_rows(3)
+        rows[2]["store"] = 999999
+        rows[1]["store"] = "abc"
+        before = Widget.objects.count()
+        response = self.client.post("/complexapi/widgets/", rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("store", response.data[1])
+        self.assertIn("store", response.data[2])
+        self.assertEqual(Widget.objects.count(), before)
+
+        response = self.client.post("/complexapi/widgets/", [1, 2], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_defaults_once_per_batch(self):
+        calls = []
+        get_default_owner = Store.__dict__["get_default_owner"]
+
+        def counting(cls, resource, request, data):
+            calls.append(data)
+            return get_default_owner.__func__(cls, resource, request, data)
+
+        Store.get_default_owner = classmethod(counting)
+        try:
+            response = self.client.post(
+                "/privateapi/stores/",
+                [{"name": "first"}, {"name": "second"}],
+                format="json",
+            )
+        finally:
+            Store.get_default_owner = get_default_owner
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(calls), 1)
+        created = Store.objects.filter(name__in=["first", "second"])
+        self.assertEqual(set(created.values_list("owner", flat=True)), {self.suser.pk})
+
+    def returning_pks(self):
+        # SQLite 3.35+ understands RETURNING, which Django 2.2's SQLite backend
+        # doesn't use, so it can stand in for a backend that returns bulk pks
+        features, ops = connection.features, connection.ops
+        return [
+            mock.patch.object(features, "can_return_id_from_insert", True),
+            mock.patch.object(features, "can_return_ids_from_bulk_insert", True),
+            mock.patch.object(
+                ops, "return_insert_id", lambda: ("RETURNING %s", ()), create=True
+            ),
+            mock.patch.object(
+                ops,
+                "fetch_returned_insert_ids",
+                lambda cursor: [row[0] for row in cursor.fetchall()],
+                create=True,
+            ),
+        ]
+
+    def test_bulk_insert(self):
+        self.assertFalse(can_bulk_insert(Customer, [{}]))
+        rows = [
+            {"store": self.stores[i].pk, "name": "bulk %s" % i, "age": 30 + i}
+            for i in range(3)
+        ]
+        with ExitStack() as stack:
+            for patch in self.returning_pks():
+                stack.enter_context(patch)
+            self.assertTrue(can_bulk_insert(Customer, rows))
+            self.assertFalse(can_bulk_insert(Widget, rows))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    "/complexapi/customers/", rows, format="json"
+                )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        inserts = [q["sql"] for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn("RETURNING", inserts[0])
+
+        # The pks bulk_create got back are the rows' own
+        for row in response.data:
+            customer = Customer.objects.get(pk=row["pk"])
+            self.assertEqual((customer.name, customer.age), (row["name"], row["age"]))
+        self.assertEqual(
+            [row["name"] for row in response.data], [row["name"] for row in rows]
+        )
+
+    def test_create_hooks(self):
+        class HookedViewSet(EasyViewSet):
+            @classmethod
+            def view_create_data(cls, view, request):
+                return dict(request.data, name=request.data["name"].upper())
+
+            @classmethod
+            def view_perform_create(cls, view, serializer):
+                return serializer.save(state="NY")
+
+        api = EasyAPI(
+            "HookedAPI", permissions.IsAdminUser, permission_context=lambda r: True
+        )
+        self.addCleanup(all_apis.discard, api)
+        api.register(Customer, viewset_class=HookedViewSet)
+        view = api.get_resource_for_model(Customer).generate_viewset().as_view(
+            {"post": "create"}
+        )
+
+        def create(rows):
+            request = APIRequestFactory().post("/", rows, format="json")
+            force_authenticate(request, user=self.suser)
+            return view(request)
+
+        rows = [
+            {"store": self.stores[0].pk, "name": "hooked %s" % i, "age": 30}
+            for i in range(2)
+        ]
+        response = create(rows)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([row["name"] for row in response.data], ["HOOKED 0", "HOOKED 1"])
+        customers = Customer.objects.filter(name__startswith="HOOKED")
+        self.assertEqual([c.state for c in customers], ["NY", "NY"])
+
+        # Every row is validated before any is saved
+        response = create(rows + [{"store": 999999, "name": "bad", "age": 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[:2], [{}, {}])
+        self.assertEqual(customers.count(), 2)
+
+
+class BulkUpdateTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.other = User.objects.create(username="other")
+        self.client.login(username=SUPER["username"], password=SUPER["password"])
+        self.mine = Store.objects.create(name="mine", owner=self.suser)
+        self.theirs = Store.objects.create(name="theirs", owner=self.other)
+        for store in [self.mine, self.theirs]:
+            for color in ["red", "red", "blue"]:
+                Widget.objects.create(
+                    color=color, size="small", shape="circle", store=store
+                )
+        self.resource = complexapi.get_resource_for_model(Widget)
+
+    def test_bulk_update(self):
+        red = Widget.objects.filter(color="red")
+        dry = self.client.patch(
+            "/complexapi/widgets/?color=red&dry_run=true", {"name": "x"}, format="json"
+        )
+        self.assertEqual(dry.data, {"count": red.count(), "dry_run": True})
+        self.assertFalse(Widget.objects.filter(name="x").exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                "/complexapi/widgets/?color=red", {"name": "x"}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], red.count())
+        self.assertEqual(Widget.objects.filter(name="x").count(), red.count())
+        self.assertEqual(
+            len([q for q in queries if q["sql"].startswith("UPDATE")]), 1
+        )
+
+        invalid = self.client.patch(
+            "/complexapi/widgets/", {"color": "plaid"}, format="json"
+        )
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_scoped_to_permitted_rows(self):
+        response = self.client.patch(
+            "/privateapi/widgets/?color=red", {"name": "owned"}, format="json"
+        )
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            set(Widget.objects.filter(name="owned").values_list("store", flat=True)),
+            {self.mine.pk},
+        )
+
+        response = self.client.delete("/privateapi/widgets/?color=blue")
+        self.assertEqual(response.data["count"], 1)
+        self.assertTrue(Widget.objects.filter(store=self.theirs, color="blue").exists())
+
+        # Read only APIs don't allow either
+        self.client.logout()
+        response = self.client.delete("/publicapi/widgets/")
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_bulk_actions_opt_in(self):
+        # complexapi's stores don't set bulk_actions
+        self.assertFalse(complexapi.get_resource_for_model(Store).bulk_actions)
+        response = self.client.delete("/complexapi/stores/")
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertNotIn("DELETE", response["Allow"])
+        response = self.client.patch(
+            "/complexapi/stores/", {"name": "x"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(Store.objects.filter(name__in=["mine", "theirs"]).count(), 2)
+        self.assertFalse(Store.objects.filter(name="x").exists())
+
+    def test_bulk_destroy(self):
+        blue = Widget.objects.filter(color="blue").count()
+        dry = self.client.delete("/complexapi/widgets/?color=blue&dry_run=true")
+        self.assertEqual(dry.data, {"count": blue, "dry_run": True})
+        self.assertEqual(Widget.objects.filter(color="blue").count(), blue)
+
+        response = self.client.delete("/complexapi/widgets/?color=blue")
+        self.assertEqual(response.data, {"count": blue, "dry_run": False})
+        self.assertFalse(Widget.objects.filter(color="blue").exists())
+
+    def test_row_limit(self):
+        self.resource.bulk_max_rows = 1
+        try:
+            response = self.client.delete("/complexapi/widgets/?color=red")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertTrue(Widget.objects.filter(color="red").exists())
+
+            row = {"color": "red", "size": "small", "shape": "circle"}
+            response = self.client.post(
+                "/complexapi/widgets/",
+                [dict(row, store=self.mine.pk)] * 2,
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        finally:
+            self.resource.bulk_max_rows = ModelResource.bulk_max_rows
+
+
+class UpsertTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.client.login(username=SUPER["username"], password=SUPER["password"])
+        self.store = Store.objects.create(name="sync", owner=self.suser)
+        for i in range(3):
+            Customer.objects.create(store=self.store, name="c%s" % i, age=30)
+
+    def rows(self, ages):
+        return [
+            {"store": self.store.pk, "name": "c%s" % i, "age": age, "state": ""}
+            for i, age in enumerate(ages)
+        ]
+
+    def test_upsert(self):
+        rows = self.rows([30, 31, 30, 40, 41])
+        url = "/complexapi/customers/upsert/"
+        dry = self.client.post(url + "?dry_run=true", rows, format="json")
+        self.assertEqual(
+            dry.data, {"created": 2, "updated": 1, "unchanged": 2, "dry_run": True}
+        )
+        self.assertEqual(Customer.objects.filter(store=self.store).count(), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, {"created": 2, "updated": 1, "unchanged": 2, "dry_run": False}
+        )
+        customers = Customer.objects.filter(store=self.store).order_by("name")
+        self.assertEqual([c.age for c in customers], [30, 31, 30, 40, 41])
+
+        # One lookup of existing rows, one bulk insert, one bulk update
+        customer_selects = [
+            q for q in queries
+            if q["sql"].startswith("SELECT") and '"widgets_customer"' in q["sql"]
+        ]
+        self.assertEqual(len(customer_selects), 1)
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("INSERT")]), 1)
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("UPDATE")]), 1)
+
+        again = self.client.post(url, rows, format="json")
+        self.assertEqual(again.data["unchanged"], 5)
+
+    def test_invalid_upserts(self):
+        missing = self.client.post(
+            "/complexapi/customers/upsert/", [{"name": "c0", "age": 1}], format="json"
+        )
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+
+        repeated = self.client.post(
+            "/complexapi/customers/upsert/", self.rows([1, 1])[:1] * 2, format="json"
+        )
+        self.assertEqual(repeated.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Only resources with a natural_key have the route, otherwise this
+        # is the detail route for a widget with pk "upsert"
+        widgets = self.client.post("/complexapi/widgets/upsert/", [], format="json")
+        self.assertEqual(widgets.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_many_to_many_rejected(self):
+        api = EasyAPI(
+            "UserUpsertAPI", permissions.IsAdminUser, permission_context=lambda r: True
+        )
+        self.addCleanup(all_apis.discard, api)
+        api.register(User, fields=["username", "groups"], natural_key=["username"])
+        view = api.get_resource_for_model(User).generate_viewset().as_view(
+            {"post": "upsert"}
+        )
+        group = Group.objects.create(name="staff")
+
+        rows = [{"username": "testsuper"}, {"username": "new", "groups": [group.pk]}]
+        request = APIRequestFactory().post("/", rows, format="json")
+        force_authenticate(request, user=self.suser)
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("groups", response.data)
+        self.assertFalse(User.objects.filter(username="new").exists())
+
+    def test_upsert_hidden_rows(self):
+        api = EasyAPI(
+            "UpsertAPI", permissions.IsAuthenticated, permission_context="store_owner"
+        )
+        self.addCleanup(all_apis.discard, api)
+        api.register(Store)
+        api.register(Customer, natural_key=["store", "name"])
+        view = api.get_resource_for_model(Customer).generate_viewset().as_view(
+            {"post": "upsert"}
+        )
+
+        other = User.objects.create(username="other")
+        hidden = Store.objects.create(name="hidden", owner=other)
+        Customer.objects.create(store=hidden, name="c0", age=50)
+
+        def upsert(rows):
+            request = APIRequestFactory().post("/", rows, format="json")
+            force_authenticate(request, user=self.suser)
+            return view(request)
+
+        rows = [dict(row, store=hidden.pk) for row in self.rows([1, 2])]
+        response = upsert(rows)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn("[0]", str(response.data["detail"]))
+        self.assertEqual(Customer.objects.filter(store=hidden).count(), 1)
+        self.assertEqual(Customer.objects.get(store=hidden).age, 50)
+
+        response = upsert(self.rows([1, 2, 3, 4]))
+        self.assertEqual(
+            response.data, {"created": 1, "updated": 3, "unchanged": 0, "dry_run": False}
+        )
@@ -0,0 +1,160 @@
+from datetime import date, datetime
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from EasyAPI.cache import ResponseCache, generation_key
+from EasyAPI.views import http_timestamp
+from example.app.api import privateapi, publicapi
+from example.app.widgets.models import Store, User, Widget, default_store_id
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for color in ["red", "blue", "green"]:
+            Widget.objects.create(
+                color=color, size="small", shape="circle", store_id=default_store_id()
+            )
+        self.resource = publicapi.get_resource_for_model(Widget)
+
+    def test_body_etag(self):
+        first = self.client.get("/publicapi/widgets/")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", first)
+
+        again = self.client.get("/publicapi/widgets/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(again.content, b"")
+
+        Widget.objects.filter(color="red").update(name="renamed")
+        changed = self.client.get("/publicapi/widgets/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+    def test_last_modified_field(self):
+        self.resource.last_modified_field = "created_at"
+        try:
+            url = "/publicapi/widgets/?color=red"
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            self.assertIn("Last-Modified", first)
+            self.assertTrue(first["ETag"].startswith('W/"'))
+
+            with CaptureQueriesContext(connection) as queries:
+                again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(len(queries), 1)
+            self.assertIn("MAX(", queries[0]["sql"])
+
+            since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+            self.assertEqual(since.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            widget = Widget.objects.filter(color="red").first()
+            detail = self.client.get("/publicapi/widgets/%s/" % widget.pk)
+            self.assertNotEqual(detail["ETag"], first["ETag"])
+
+            widget.delete()
+            gone = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(gone.status_code, status.HTTP_200_OK)
+        finally:
+            self.resource.last_modified_field = None
+
+
+    def test_malformed_pk(self):
+        self.resource.last_modified_field = "created_at"
+        try:
+            response = self.client.get("/publicapi/widgets/abc/")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        finally:
+            self.resource.last_modified_field = None
+
+        # Users render groups, so they're retrieved through the serializer
+        self.client.force_authenticate(
+            User.objects.create_superuser("admin", "admin@test.co", "admin123")
+        )
+        response = self.client.get("/complexapi/users/abc/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_date_timestamps(self):
+        day = date(2020, 3, 1)
+        midnight = datetime(2020, 3, 1, tzinfo=timezone.utc)
+        self.assertEqual(http_timestamp(day), http_timestamp(midnight))
+        self.assertEqual(http_date(http_timestamp(day)), "Sun, 01 Mar 2020 00:00:00 GMT")
+
+
+class ResponseCacheTest(APITestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.client = APIClient()
+        self.store = Store.objects.create(name="cached", owner=User.objects.first())
+        Widget.objects.create(
+            color="red", size="small", shape="circle", store=self.store
+        )
+        self.cache = publicapi.get_resource_for_model(Store).response_cache
+        self.cache.hits = self.cache.misses = 0
+
+    def test_hit_and_miss(self):
+        url = "/publicapi/stores/%s/" % self.store.pk
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+        unchanged = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(unchanged.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Query parameters are part of the key
+        self.client.get(url + "?fields=name")
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+        options = self.client.options("/publicapi/stores/")
+        self.assertEqual(options.data["cache"]["alias"], "default")
+
+    def test_invalidated_by_writes(self):
+        url = "/publicapi/stores/%s/" % self.store.pk
+        self.client.get(url)
+
+        self.store.name = "renamed"
+        self.store.save()
+        renamed = self.client.get(url)
+        self.assertEqual(renamed.data["name"], "renamed")
+
+        # Inlined widgets invalidate the store's responses too
+        Widget.objects.create(
+            color="blue", size="small", shape="circle", store=self.store
+        )
+        self.client.get(url)
+        self.assertEqual(self.cache.stats(), {"alias": "default", "hits": 0, "misses": 3})
+
+    def test_evicted_generation(self):
+        url = "/publicapi/stores/%s/" % self.store.pk
+        caches["default"].delete(generation_key(Store))
+        self.client.get(url)
+        self.store.name = "renamed"
+        self.store.save()
+
+        # A generation lost from the cache doesn't lead back to older responses
+        caches["default"].delete(generation_key(Store))
+        renamed = self.client.get(url)
+        self.assertEqual(renamed.data["name"], "renamed")
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+    def test_scope(self):
+        user = User.objects.first()
+        self.assertEqual(self.cache.get_scope("list", user), "*")
+
+        private = ResponseCache(privateapi.get_resource_for_model(Store))
+        self.assertEqual(private.get_scope("list", user), "user:%s" % user.pk)
+        self.assertEqual(private.get_scope("list", None), "user:None")
@@ -87,3 +87,122 @@ class FilteringTest(APITestCase):
                                                   )
             self.assertEqual(api_widgets.status_code, status.HTTP_200_OK)
             self.assertEqual(len(api_widgets.data), widgets.count())
+
+
+class LookupFiltersTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER['username'],
+            email=SUPER['email'],
+            password=SUPER['password']
+        )
+        self.client.login(username=SUPER['username'], password=SUPER['password'])
+        store = Store.objects.create(name='lookups', owner=self.suser)
+        for color, size, shape in itertools.product(COLORS[:2], SIZES[:2], SHAPES[:2]):
+            Widget.objects.create(color=color[0], size=size[0], shape=shape[0], store=store)
+
+    def test_named_lookups(self):
+        cost = sorted(Widget.objects.values_list('cost', flat=True))[2]
+        for param, lookup in [('cost_less_than', 'lt'), ('cost_greater_than', 'gt')]:
+            response = self.client.get('/complexapi/widgets/?%s=%s' % (param, cost))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            expected = Widget.objects.filter(**{'cost__%s' % lookup: cost})
+            self.assertEqual(len(response.data), expected.count())
+
+        name = Widget.objects.first().name
+        response = self.client.get('/complexapi/widgets/?name_icontains=%s' % name[1:].upper())
+        self.assertEqual(
+            len(response.data), Widget.objects.filter(name__icontains=name[1:]).count()
+        )
+
+    def test_filters_declared_once(self):
+        from example.app.api import complexapi
+
+        filterset_class = complexapi.get_resource_for_model(Widget).filterset_class
+        self.assertIn('cost_less_than', filterset_class.base_filters)
+        self.assertIn('unarchived', filterset_class.base_filters)
+        self.assertEqual(filterset_class.base_filters['name_icontains'].lookup_expr, 'icontains')
+
+
+    def test_filters_copied_per_request(self):
+        import django_filters
+        from rest_framework.test import APIRequestFactory
+
+        from EasyAPI.filters import CompiledFilters
+
+        other = User.objects.create(username='other')
+        Store.objects.create(name='other', owner=other)
+
+        class StoreFilters(django_filters.FilterSet):
+            store = django_filters.ModelChoiceFilter(
+                queryset=lambda request: Store.objects.filter(owner=request.user)
+            )
+
+            class Meta:
+                model = Widget
+                fields = []
+
+        StoreFilters.base_filters = CompiledFilters(StoreFilters.base_filters)
+        filtersets = []
+        for user in [self.suser, other]:
+            request = APIRequestFactory().get('/')
+            request.user = user
+            filtersets.append(StoreFilters(queryset=Widget.objects.all(), request=request))
+
+        names = [[s.name for s in f.form.fields['store'].queryset] for f in filtersets]
+        self.assertEqual(names, [['lookups'], ['other']])
+        extras = [f.filters['store'].extra['queryset'] for f in filtersets]
+        self.assertEqual([[s.name for s in qs] for qs in extras], names)
+        self.assertTrue(callable(StoreFilters.base_filters['store'].extra['queryset']))
+
+
+class RelatedFiltersTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username=TEST['username'], email=TEST['email'])
+        self.user.set_password(TEST['password'])
+        self.user.save()
+        self.other = User.objects.create(username='other')
+        self.mine = Store.objects.create(name='corner shop', owner=self.user)
+        self.theirs = Store.objects.create(name='corner market', owner=self.other)
+        for store in [self.mine, self.theirs]:
+            for color in [COLORS[0][0], COLORS[0][0], COLORS[1][0]]:
+                Widget.objects.create(
+                    color=color, size=SIZES[0][0], shape=SHAPES[0][0], store=store
+                )
+        self.client.login(username=TEST['username'], password=TEST['password'])
+
+    def test_forward_relation(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/privateapi/widgets/?store__name_icontains=corner')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({row['store'] for row in response.data}, {self.mine.pk})
+        # One query, and no DISTINCT on the widgets themselves
+        widget_queries = [
+            q['sql'] for q in queries
+            if q['sql'].startswith('SELECT "widgets_widget"')
+        ]
+        self.assertEqual(len(widget_queries), 1)
+        self.assertIn('"widgets_store"', widget_queries[0])
+
+    def test_reverse_relation(self):
+        red, blue, green = [color[0] for color in COLORS[:3]]
+        Widget.objects.filter(store=self.mine, color=blue).update(color=green)
+        response = self.client.get('/privateapi/stores/?widgets__color=%s' % red)
+        self.assertEqual([row['pk'] for row in response.data], [self.mine.pk])
+        response = self.client.get('/privateapi/stores/?widgets__color=%s' % blue)
+        self.assertEqual(response.data, [])
+
+    def test_respects_related_permissions(self):
+        # The store_owner context only lists your own stores, so other stores
+        # can't be probed through a relation filter
+        from example.app.api import privateapi
+
+        resource = privateapi.get_resource_for_model(Widget)
+        self.assertIn('store__name', resource.filterset_class.base_filters)
+        response = self.client.get('/privateapi/widgets/?store__name=corner%20market')
+        self.assertEqual(response.data, [])
@@ -1,15 +1,21 @@
+import hashlib
 import itertools
 import json
 import random
+import tempfile
 
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
 from django.test import modify_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.status import HTTP_400_BAD_REQUEST, HTTP_503_SERVICE_UNAVAILABLE
 from rest_framework.test import APIClient, APITestCase
 from graphql_relay import from_global_id, to_global_id
 
 from unittest import skip
+from example.app.api import publicapi
 from example.app.widgets.models import Store, Widget, default_store_id
 from example.app.widgets.options import COLORS, SHAPES, SIZES
 
@@ -73,12 +79,22 @@ class GraphQLMethodsTest(APITestCase):
 
     def test_public_root(self):
         schema = self.gql(PUBLIC, "{ __schema { __typename } }")
-        self.assertEqual(schema, {"data": {"__schema": {"__typename": "__Schema"}}})
+        self.assertEqual(
+            schema,
+            {
+                "data": {"__schema": {"__typename": "__Schema"}},
+                "extensions": {"cost": {"depth": 1, "nodes": 1, "cost": 0}},
+            },
+        )
 
     def test_public_list_stores(self):
         stores = self.gql(PUBLIC, "{ allStores { edges { node { name } } } }")
         self.assertEqual(
-            stores, {"data": {"allStores": {"edges": [{"node": {"name": "DEFAULT"}}]}}}
+            stores,
+            {
+                "data": {"allStores": {"edges": [{"node": {"name": "DEFAULT"}}]}},
+                "extensions": {"cost": {"depth": 4, "nodes": 4, "cost": 100}},
+            },
         )
 
         self.gql(
@@ -106,7 +122,11 @@ class GraphQLMethodsTest(APITestCase):
             "{ allStores { edges { node { name, owner {username} } } } }",
             user=TEST,
         )
-        self.assertEqual(stores, {"data": {"allStores": {"edges": []}}})
+        # Stores and their owners, up to a page of 100 each
+        cost = {"cost": {"depth": 5, "nodes": 6, "cost": 200}}
+        self.assertEqual(
+            stores, {"data": {"allStores": {"edges": []}}, "extensions": cost}
+        )
 
         Store.objects.update(owner=self.user)
         # Now TEST owns the store and can see the private fields
@@ -129,7 +149,8 @@ class GraphQLMethodsTest(APITestCase):
                             }
                         ]
                     }
-                }
+                },
+                "extensions": cost,
             },
         )
 
@@ -213,3 +234,286 @@ class GraphQLMethodsTest(APITestCase):
         self.assertEqual(filtered_del.status_code, status.HTTP_200_OK)
         self.assertEqual(filtered_del.data, [])
 
+
+
+class GraphQLBatchingTest(APITestCase):
+    QUERY = """{ allStores { edges { node {
+        name, widgets(color: "red") { edges { node { name, store { name } } } }
+    } } } }"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create(username="owner")
+
+    def add_stores(self, count):
+        for i in range(count):
+            store = Store.objects.create(name="store", owner=self.owner)
+            for color in ["red", "red", "blue"]:
+                Widget.objects.create(
+                    color=color, size="small", shape="circle", store=store
+                )
+
+    def query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(PUBLIC, data={"query": self.QUERY})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content.decode("utf-8")), len(queries)
+
+    def test_one_query_per_level(self):
+        self.add_stores(2)
+        few, few_queries = self.query()
+        self.add_stores(8)
+        many, many_queries = self.query()
+
+        # Counting and listing stores, then one query each for their widgets
+        # and for the widgets' stores
+        self.assertEqual(few_queries, many_queries)
+        self.assertEqual(many_queries, 4)
+        edges = many["data"]["allStores"]["edges"]
+        self.assertEqual(len(edges), Store.objects.count())
+        for edge in edges:
+            if edge["node"]["name"] != "store":
+                continue
+            widgets = edge["node"]["widgets"]["edges"]
+            self.assertEqual(len(widgets), 2)
+            self.assertEqual(
+                [w["node"]["store"] for w in widgets], [{"name": "store"}] * 2
+            )
+
+    def test_inline_pagination(self):
+        self.add_stores(3)
+        paged = self.client.post(
+            PUBLIC,
+            data={
+                "query": "{ allStores { edges { node { name, "
+                "widgets(first: 1) { edges { node { color } } } } } } }"
+            },
+        )
+        edges = json.loads(paged.content.decode("utf-8"))["data"]["allStores"]["edges"]
+        self.assertEqual(
+            [
+                len(edge["node"]["widgets"]["edges"])
+                for edge in edges
+                if edge["node"]["name"] == "store"
+            ],
+            [1, 1, 1],
+        )
+
+
+class GraphQLSelectionTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = User.objects.create(username="owner")
+        self.store = Store.objects.create(name="selected", owner=owner)
+        for color in ["red", "blue"]:
+            Widget.objects.create(
+                color=color, size="small", shape="circle", store=self.store
+            )
+
+    def query(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(PUBLIC, data={"query": query})
+        data = json.loads(response.content.decode("utf-8"))
+        self.assertNotIn("errors", data)
+        return data["data"], [q["sql"] for q in queries]
+
+    def test_columns_and_joins(self):
+        data, queries = self.query(
+            "{ allWidgets { edges { node { name, store { name } } } } }"
+        )
+        names = {edge["node"]["store"]["name"] for edge in data["allWidgets"]["edges"]}
+        self.assertIn("selected", names)
+
+        # A count, then widgets with their stores joined in
+        self.assertEqual(len(queries), 2)
+        self.assertIn('INNER JOIN "widgets_store"', queries[1])
+        self.assertNotIn('"widgets_widget"."size"', queries[1])
+        self.assertNotIn('"widgets_widget"."color"', queries[1])
+
+    def test_fragments_and_prefetch(self):
+        data, queries = self.query(
+            """{ allStores { edges { node { ...StoreWidgets } } } }
+            fragment StoreWidgets on Store {
+                name, widgets { edges { node { ... on Widget { color } } } }
+            }"""
+        )
+        stores = [e["node"] for e in data["allStores"]["edges"]]
+        selected = [s for s in stores if s["name"] == "selected"][0]
+        self.assertEqual(
+            sorted(e["node"]["color"] for e in selected["widgets"]["edges"]),
+            ["blue", "red"],
+        )
+
+        # A count, the stores, and one prefetch of their widgets
+        self.assertEqual(len(queries), 3)
+        self.assertIn('"widgets_widget"."color"', queries[2])
+        self.assertNotIn('"widgets_widget"."name"', queries[2])
+
+    def test_node(self):
+        data, queries = self.query(
+            '{ Store(id: "%s") { name } }' % to_global_id("Store", self.store.pk)
+        )
+        self.assertEqual(data["Store"], {"name": "selected"})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"widgets_store"."owner_id"', queries[0])
+
+    def test_property_hints(self):
+        data, queries = self.query("{ allWidgets { edges { node { stub } } } }")
+        stubs = [edge["node"]["stub"] for edge in data["allWidgets"]["edges"]]
+        self.assertIn("selected-red.small.circle", stubs)
+
+        # stub declares the store it reads and the columns it needs
+        self.assertEqual(len(queries), 2)
+        self.assertIn('INNER JOIN "widgets_store"', queries[1])
+        self.assertNotIn('"widgets_widget"."size"', queries[1])
+
+        # age declares nothing, so every column is loaded
+        data, queries = self.query("{ allWidgets { edges { node { name, age } } } }")
+        self.assertIn('"widgets_widget"."size"', queries[1])
+
+
+class GraphQLLimitsTest(APITestCase):
+    NESTED = """query Nested($first: Int) { allStores(first: $first) { edges { node {
+        widgets(first: 10) { edges { node { ...WidgetStore } } }
+    } } } }
+    fragment WidgetStore on Widget { name, store { name } }"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.limits = (
+            publicapi.graphql_max_depth,
+            publicapi.graphql_max_nodes,
+            publicapi.graphql_max_cost,
+        )
+
+    def tearDown(self):
+        (
+            publicapi.graphql_max_depth,
+            publicapi.graphql_max_nodes,
+            publicapi.graphql_max_cost,
+        ) = self.limits
+
+    def post(self, query, variables=None):
+        data = {"query": query}
+        if variables:
+            data["variables"] = json.dumps(variables)
+        response = self.client.post(PUBLIC, data=data)
+        return response.status_code, json.loads(response.content.decode("utf-8"))
+
+    def test_cost_estimate(self):
+        code, result = self.post(self.NESTED, {"first": 5})
+        self.assertEqual(code, status.HTTP_200_OK)
+        # 5 stores, 10 widgets each, and a store per widget
+        self.assertEqual(
+            result["extensions"]["cost"], {"depth": 8, "nodes": 9, "cost": 105}
+        )
+
+        code, result = self.post(self.NESTED)
+        self.assertEqual(result["extensions"]["cost"]["cost"], 2100)
+
+    def test_limits_enforced(self):
+        with CaptureQueriesContext(connection) as queries:
+            publicapi.graphql_max_depth = 7
+            code, result = self.post(self.NESTED, {"first": 5})
+        self.assertEqual(code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            result["errors"][0]["message"], "Query depth 8 exceeds the limit of 7"
+        )
+        self.assertEqual(len(queries), 0)
+
+        publicapi.graphql_max_depth = 10
+        publicapi.graphql_max_cost = 1000
+        code, result = self.post(self.NESTED, {"first": 5})
+        self.assertEqual(code, status.HTTP_200_OK)
+        code, result = self.post(self.NESTED)
+        self.assertEqual(code, HTTP_400_BAD_REQUEST)
+        self.assertIn("Query cost 2100", result["errors"][0]["message"])
+
+        publicapi.graphql_max_nodes = 3
+        code, result = self.post("{ allStores { edges { node { name } } } }")
+        self.assertEqual(code, HTTP_400_BAD_REQUEST)
+
+    def test_string_page_size(self):
+        # Variables are measured before graphql-core coerces them to Int
+        code, result = self.post(self.NESTED, {"first": "5"})
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.assertEqual(result["extensions"]["cost"]["cost"], 105)
+
+        publicapi.graphql_max_depth = 7
+        code, result = self.post(self.NESTED, {"first": "5"})
+        self.assertEqual(code, HTTP_400_BAD_REQUEST)
+        self.assertIn("Query depth 8", result["errors"][0]["message"])
+
+        publicapi.graphql_max_depth = 10
+        code, result = self.post(self.NESTED, {"first": "five"})
+        self.assertEqual(code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            result["errors"][0]["message"], "Query could not be analysed"
+        )
+
+
+class PersistedQueryTest(APITestCase):
+    QUERY = "{ allStores { edges { node { name } } } }"
+
+    def setUp(self):
+        self.client = APIClient()
+        caches["default"].clear()
+        self.sha = hashlib.sha256(self.QUERY.encode("utf-8")).hexdigest()
+
+    def post(self, **body):
+        response = self.client.post(
+            PUBLIC, data=json.dumps(body), content_type="application/json"
+        )
+        return response.status_code, json.loads(response.content.decode("utf-8"))
+
+    def persisted(self, sha):
+        return {"persistedQuery": {"version": 1, "sha256Hash": sha}}
+
+    def test_document_cache(self):
+        documents = publicapi.graphql_documents
+        query = "{ allWidgets { edges { node { color } } } }"
+        code, first = self.post(query=query)
+        hits = documents.hits
+        code, again = self.post(query=query)
+        self.assertEqual(again, first)
+        self.assertEqual(documents.hits, hits + 2)
+
+        # Validation errors are remembered too
+        for i in range(2):
+            code, invalid = self.post(query="{ allWidgets { size } }")
+            self.assertEqual(code, HTTP_400_BAD_REQUEST)
+            self.assertIn("size", invalid["errors"][0]["message"])
+
+    def test_automatic_persisted_queries(self):
+        code, missing = self.post(extensions=self.persisted(self.sha))
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.assertEqual(
+            missing["errors"][0]["extensions"], {"code": "PERSISTED_QUERY_NOT_FOUND"}
+        )
+
+        code, stored = self.post(query=self.QUERY, extensions=self.persisted(self.sha))
+        self.assertEqual(code, status.HTTP_200_OK)
+        code, by_hash = self.post(extensions=self.persisted(self.sha))
+        self.assertEqual(by_hash["data"], stored["data"])
+
+        response = self.client.get(
+            PUBLIC,
+            {"extensions": json.dumps(self.persisted(self.sha))},
+            HTTP_ACCEPT="application/json",
+        )
+        by_get = json.loads(response.content.decode("utf-8"))
+        self.assertEqual(by_get["data"], stored["data"])
+
+        code, mismatch = self.post(
+            query="{ __typename }", extensions=self.persisted(self.sha)
+        )
+        self.assertEqual(code, HTTP_400_BAD_REQUEST)
+
+    def test_warm_from_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as f:
+            json.dump({self.sha: self.QUERY}, f)
+            f.flush()
+            self.assertEqual(publicapi.persisted_queries.warm(f.name), 1)
+        code, result = self.post(extensions=self.persisted(self.sha))
+        self.assertNotIn("errors", result)
+        self.assertIn("allStores", result["data"])
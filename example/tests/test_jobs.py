@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from EasyAPI.jobs import ThreadPoolBackend
+from example.app.widgets.models import Widget, default_store_id
+
+User = get_user_model()
+
+
+@override_settings(EASY_API_JOB_BACKEND="EasyAPI.jobs.ImmediateBackend")
+class BackgroundActionTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for color in ["red", "red", "blue"]:
+            Widget.objects.create(
+                color=color, size="small", shape="circle", store_id=default_store_id()
+            )
+
+    def test_background_action(self):
+        response = self.client.get("/publicapi/widgets/color_report/")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.data["url"].endswith("/jobs/%s/" % response.data["id"]))
+
+        job = self.client.get(response.data["url"])
+        self.assertEqual(job.status_code, status.HTTP_200_OK)
+        self.assertEqual(job.data["status"], "done")
+        counts = Widget.objects.filter(color="red").count()
+        self.assertEqual(job.data["result"]["red"], counts)
+
+        # Another user can't see it
+        user = User.objects.create(username="someone")
+        self.client.force_authenticate(user)
+        self.assertEqual(
+            self.client.get(response.data["url"]).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    def test_unknown_job(self):
+        response = self.client.get("/publicapi/widgets/jobs/abc123/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Resources without background actions have no job route
+        response = self.client.get("/publicapi/stores/jobs/abc123/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ThreadPoolBackendTest(APITestCase):
+    def test_runs_on_pool(self):
+        backend = ThreadPoolBackend()
+        job = backend.submit("double", lambda x: x * 2, 21)
+        backend.executor.shutdown(wait=True)
+        self.assertEqual(backend.get(job.id).as_dict()["result"], 42)
+
+        backend = ThreadPoolBackend()
+        failed = backend.submit("fail", lambda: 1 / 0)
+        backend.executor.shutdown(wait=True)
+        self.assertEqual(failed.status, "failed")
+        self.assertIn("division", failed.error)
@@ -0,0 +1,179 @@
+from django.test import TestCase, override_settings
+from rest_framework import permissions
+
+from EasyAPI.api import EasyAPI, all_apis
+from EasyAPI.permissions import NullAuditLog, resolve_action_permission
+from EasyAPI.resources import ModelResource
+from EasyAPI.scope import get_request_scope, request_scope
+from example.app.api import privateapi, publicapi
+from example.app.widgets.models import Customer, Purchase, Store, User, Widget
+
+
+class PermissionDecisionTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username="owner")
+        self.other = User.objects.create(username="other")
+        for owner in [self.owner, self.other]:
+            store = Store.objects.create(name=owner.username, owner=owner)
+            Widget.objects.create(color="red", size="small", shape="circle", store=store)
+        self.resource = privateapi.get_resource_for_model(Widget)
+
+    def test_decisions_precomputed(self):
+        decisions = self.resource.permission_decisions
+        self.assertIn(("store_owner", "list"), decisions)
+        self.assertIn(("store_owner", "destroy"), decisions)
+
+        # A lookup returns the stored decision without resolving it again
+        decisions[("store_owner", "list")] = ("store", ["stored"])
+        try:
+            permission, audit = self.resource.get_action_permission("list", self.owner)
+            self.assertEqual(permission, "store")
+        finally:
+            del decisions[("store_owner", "list")]
+            self.resource.precompute_permissions(["list"])
+
+        permission = resolve_action_permission(self.resource, "list", NullAuditLog())
+        self.assertEqual(
+            self.resource.get_action_permission("list", self.owner)[0], permission
+        )
+
+    def test_audit_is_opt_in(self):
+        qs, audit = self.resource.get_permitted_queryset("list", user=self.owner)
+        self.assertEqual(list(qs), list(Widget.objects.filter(store__owner=self.owner)))
+        self.assertIsInstance(audit, NullAuditLog)
+        self.assertEqual(len(audit), 0)
+
+        with override_settings(EASY_API_AUDIT_LOG=True):
+            qs, audit = self.resource.get_permitted_queryset("list", user=self.owner)
+            self.assertEqual(qs.count(), 1)
+            self.assertIn("get_permitted_queryset on WidgetResource for owner", audit)
+            self.assertIn("  Matched global action store_owner", audit)
+
+            permission, audit = publicapi.get_resource_for_model(
+                Widget
+            ).get_action_permission("list", self.owner)
+            self.assertTrue(audit[0].startswith("get_action_permissions action=list"))
+
+
+class RelationPathTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username="owner")
+        other = User.objects.create(username="other")
+        for i, user in enumerate([self.owner, other, self.owner]):
+            store = Store.objects.create(name="s%s" % i, owner=user)
+            customer = Customer.objects.create(store=store, name="c%s" % i, age=20)
+            for _ in range(2):
+                Purchase.objects.create(customer=customer)
+        self.resource = privateapi.get_resource_for_model(Purchase)
+
+    def test_chain_compiled(self):
+        path, terminal = self.resource.permission_paths[
+            ("store_owner", "list", "customer")
+        ]
+        self.assertEqual(path, "customer__store")
+        self.assertIs(terminal, privateapi.get_resource_for_model(Store))
+
+    def test_same_rows_single_subquery(self):
+        qs, audit = self.resource.get_permitted_queryset("list", user=self.owner)
+
+        # What the recursive version built, one IN (SELECT DISTINCT) per hop
+        stores = Store.objects.filter(owner=self.owner)
+        customers = Customer.objects.filter(
+            store_id__in=stores.values_list("id", flat=True).distinct()
+        )
+        nested = Purchase.objects.filter(
+            customer_id__in=customers.values_list("id", flat=True).distinct()
+        )
+
+        self.assertEqual(
+            sorted(qs.values_list("pk", flat=True)),
+            sorted(nested.values_list("pk", flat=True)),
+        )
+        self.assertEqual(qs.count(), 4)
+
+        sql, nested_sql = str(qs.query), str(nested.query)
+        self.assertEqual(nested_sql.count("SELECT"), 3)
+        self.assertEqual(sql.count("SELECT"), 2)
+        self.assertNotIn("DISTINCT", sql)
+        self.assertIn('INNER JOIN "widgets_customer"', sql)
+
+        with override_settings(EASY_API_AUDIT_LOG=True):
+            qs, audit = self.resource.get_permitted_queryset("list", user=self.owner)
+        self.assertIn(
+            "Compiled relation chain customer -> store to StoreResource", audit
+        )
+
+
+    def test_chain_keeps_default_querysets(self):
+        class AdultCustomers(ModelResource):
+            name = "AdultCustomerResource"
+
+            class Meta:
+                model = Customer
+
+            def get_default_queryset(self):
+                return Customer.objects.filter(age__gte=21)
+
+        api = EasyAPI(
+            "AdultAPI", permissions.IsAuthenticated, permission_context="store_owner"
+        )
+        self.addCleanup(all_apis.discard, api)
+        api.register(Store)
+        api.register(AdultCustomers)
+        api.register(Purchase)
+        Customer.objects.filter(name="c2").update(age=30)
+
+        resource = api.get_resource_for_model(Purchase)
+        path, terminal = resource.permission_paths[("store_owner", "list", "customer")]
+        self.assertEqual(path, "customer")
+        self.assertIs(terminal, api.get_resource_for_model(Customer))
+
+        qs, audit = resource.get_permitted_queryset("list", user=self.owner)
+        self.assertEqual(
+            sorted(qs.values_list("pk", flat=True)),
+            sorted(
+                Purchase.objects.filter(customer__name="c2").values_list("pk", flat=True)
+            ),
+        )
+        self.assertEqual(qs.count(), 2)
+
+
+class RequestScopeTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username="owner")
+        store = Store.objects.create(name="scoped", owner=self.owner)
+        self.widget = Widget.objects.create(
+            color="red", size="small", shape="circle", store=store
+        )
+        self.resource = privateapi.get_resource_for_model(Widget)
+
+    def test_permitted_querysets_shared(self):
+        with request_scope() as scope:
+            first, audit = self.resource.get_permitted_queryset("list", self.owner)
+            again, audit = self.resource.get_permitted_queryset("list", self.owner)
+            self.assertEqual(list(first), [self.widget])
+            self.assertIsNone(again._result_cache)
+            self.assertEqual(list(again), [self.widget])
+
+            self.resource.get_permitted_queryset("destroy", self.owner)
+            self.resource.get_permitted_queryset("list", None)
+        # The widget's relation chain asks for the store's permitted rows too
+        self.assertEqual(scope.hits, 1)
+        self.assertEqual(len(scope.querysets), 6)
+        self.assertIsNone(get_request_scope())
+
+    def test_identity_map(self):
+        with request_scope():
+            with self.assertNumQueries(1):
+                first, audit = self.resource.get_permitted_object(
+                    self.widget.pk, "retrieve", user=self.owner
+                )
+                again, audit = self.resource.get_permitted_object(
+                    str(self.widget.pk), "retrieve", user=self.owner
+                )
+            self.assertIs(first, again)
+
+        with self.assertNumQueries(1):
+            self.resource.get_permitted_object(
+                self.widget.pk, "retrieve", user=self.owner
+            )
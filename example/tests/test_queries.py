@@ -0,0 +1,618 @@
+import base64
+import json
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.sessions.models import Session
+from django.db import connection, models
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext, isolate_apps
+from django.utils import timezone
+from rest_framework import permissions, serializers, status
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+
+from EasyAPI.aggregates import aggregate
+from EasyAPI.api import EasyAPI, all_apis
+from EasyAPI.compiler import compile_serializer_class
+from EasyAPI.resources import ModelResource
+from EasyAPI.search import (
+    ContainsSearchBackend,
+    SQLiteSearchBackend,
+    create_search_indexes,
+)
+from example.app.api import complexapi, privateapi, publicapi
+from example.app.widgets.models import Customer, Purchase, Store, Widget
+from example.tests.factories import PurchaseFactory
+
+User = get_user_model()
+
+SUPER = {"username": "testsuper", "email": "super@test.co", "password": "super123"}
+
+
+class QueryPlanTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.group = Group.objects.create(name="staff")
+        self.suser.groups.add(self.group)
+        self.client.login(username=SUPER["username"], password=SUPER["password"])
+
+    def add_users(self, count):
+        for i in range(count):
+            user = User.objects.create(username="user%s-%s" % (User.objects.count(), i))
+            user.groups.add(self.group)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    def test_plan_from_fields(self):
+        users = complexapi.get_resource_for_model(User)
+        self.assertEqual(users.query_plan["groups"], ("prefetch", "groups"))
+        self.assertEqual(
+            users.query_plan["user_permissions"], ("prefetch", "user_permissions")
+        )
+
+        # FKs rendered as a pk come from the local column, no join needed
+        widgets = complexapi.get_resource_for_model(Widget)
+        self.assertNotIn("store", widgets.query_plan)
+
+    def test_many_to_many_list_is_constant(self):
+        self.add_users(3)
+        few, response = self.count_queries("/complexapi/users/")
+        self.assertEqual(len(response.data), User.objects.count())
+
+        self.add_users(12)
+        many, response = self.count_queries("/complexapi/users/")
+        self.assertEqual(len(response.data), User.objects.count())
+        self.assertEqual(few, many)
+        self.assertEqual(response.data[-1]["groups"], [self.group.pk])
+
+    def test_property_hints(self):
+        store = Store.objects.create(name="hinted", owner=self.suser)
+
+        def add_widgets(count):
+            for i in range(count):
+                Widget.objects.create(
+                    color="red", size="small", shape="circle", store=store
+                )
+
+        add_widgets(2)
+        few, response = self.count_queries("/privateapi/widgets/")
+        add_widgets(10)
+        many, response = self.count_queries("/privateapi/widgets/")
+        self.assertEqual(few, many)
+        self.assertEqual(response.data[0]["stub"], "hinted-red.small.circle")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/privateapi/widgets/?fields=stub")
+        self.assertEqual(
+            response.data[0],
+            {"pk": response.data[0]["pk"], "stub": "hinted-red.small.circle"},
+        )
+        listing = [q["sql"] for q in queries if 'FROM "widgets_widget"' in q["sql"]]
+        listing = listing[-1]
+        self.assertIn('INNER JOIN "widgets_store"', listing)
+        self.assertNotIn('"widgets_widget"."size"', listing)
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.client.login(username=SUPER["username"], password=SUPER["password"])
+        store = Store.objects.create(owner=self.suser)
+        Widget.objects.create(color="red", size="small", shape="circle", store=store)
+        for i in range(25):
+            PurchaseFactory.create()
+
+    def walk(self, url):
+        pks, pages, queries = [], 0, []
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("Count", response)
+            queries.append([q["sql"] for q in captured])
+            pks += [row["pk"] for row in response.data["results"]]
+            url = response.data["next"]
+            pages += 1
+        return pks, pages, queries
+
+    def test_pages_follow_ordering(self):
+        pks, pages, queries = self.walk(
+            "/complexapi/purchases/?ordering=-sale_price&page_size=7"
+        )
+        expected = list(
+            Purchase.objects.order_by("-sale_price", "pk").values_list("pk", flat=True)
+        )
+        self.assertEqual(pks, expected)
+        self.assertEqual(pages, 4)
+
+        # Every page costs the same and never counts the table
+        self.assertEqual(len(set(len(q) for q in queries)), 1)
+        for page in queries:
+            self.assertFalse(any("COUNT(" in sql for sql in page))
+
+    def test_descending_pk(self):
+        expected = list(Purchase.objects.order_by("-pk").values_list("pk", flat=True))
+        for ordering in ["-id", "-pk"]:
+            pks, pages, queries = self.walk(
+                "/complexapi/purchases/?ordering=%s&page_size=7" % ordering
+            )
+            self.assertEqual(pks, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/complexapi/purchases/?cursor=nonsense")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # A cursor for the right ordering missing one of its values
+        url = "/complexapi/purchases/?ordering=-sale_price&page_size=7"
+        cursor = parse_qs(urlparse(self.client.get(url).data["next"]).query)["cursor"]
+        names, values = json.loads(base64.urlsafe_b64decode(cursor[0]))
+        for broken in [values[:-1], values + values, "abc"]:
+            encoded = base64.urlsafe_b64encode(json.dumps([names, broken]).encode())
+            response = self.client.get(url + "&cursor=" + encoded.decode("ascii"))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, broken)
+
+
+class SparseFieldsTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.client.login(username=SUPER["username"], password=SUPER["password"])
+        store = Store.objects.create(owner=self.suser, name="sparse")
+        for color in ["red", "blue", "green"]:
+            Widget.objects.create(color=color, size="small", shape="circle", store=store)
+
+    def test_sparse_list(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/complexapi/widgets/?fields=name,color,store")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), Widget.objects.count())
+        for row in response.data:
+            self.assertEqual(set(row.keys()), {"pk", "name", "color", "store"})
+
+        select = [q["sql"] for q in queries if '"widgets_widget"."name"' in q["sql"]][0]
+        self.assertNotIn('"widgets_widget"."shape"', select)
+        self.assertNotIn('"widgets_widget"."cost"', select)
+
+    def test_sparse_retrieve(self):
+        widget = Widget.objects.first()
+        response = self.client.get("/complexapi/widgets/%s/?fields=cost" % widget.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"pk": widget.pk, "cost": widget.cost})
+
+    def test_sparse_serializer_cached(self):
+        resource = complexapi.get_resource_for_model(Widget)
+        self.assertIs(
+            resource.get_sparse_serializer(["color", "name"]),
+            resource.get_sparse_serializer(["name", "color"]),
+        )
+
+    def test_sparse_caches_bounded(self):
+        resource = complexapi.get_resource_for_model(Widget)
+        resource.serializer_cache_size = 2
+        self.addCleanup(delattr, resource, "serializer_cache_size")
+
+        first = resource.get_sparse_serializer(["name"])
+        resource.get_sparse_serializer(["color"])
+        self.assertIs(resource.get_sparse_serializer(["name"]), first)
+        for fields in [["size"], ["shape"], ["cost"]]:
+            resource.get_row_converter(resource.get_sparse_serializer(fields))
+        self.assertEqual(len(resource.sparse_serializers), 2)
+        self.assertEqual(len(resource.row_converters), 2)
+        self.assertEqual(list(resource.sparse_serializers), [("shape",), ("cost",)])
+        self.assertIsNot(resource.get_sparse_serializer(["name"]), first)
+
+    def test_unknown_field(self):
+        response = self.client.get("/complexapi/widgets/?fields=name,secret")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("secret", str(response.data["fields"]))
+
+
+class ValuesFastPathTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.client.login(username=SUPER["username"], password=SUPER["password"])
+        store = Store.objects.create(owner=self.suser, name="fast")
+        for color in ["red", "blue", "green"]:
+            Widget.objects.create(color=color, size="small", shape="circle", store=store)
+        Widget.objects.filter(color="red").update(archived_at=timezone.now())
+        self.resource = complexapi.get_resource_for_model(Widget)
+
+    def compare(self, url):
+        self.resource.values_fast_path = False
+        try:
+            slow = self.client.get(url)
+        finally:
+            self.resource.values_fast_path = True
+        fast = self.client.get(url)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_detects_plain_columns(self):
+        converter = self.resource.get_row_converter(self.resource.serializer_class)
+        self.assertIn("store_id", converter.columns)
+
+        users = complexapi.get_resource_for_model(User)
+        self.assertIsNone(users.get_row_converter(users.serializer_class))
+
+    def test_identical_output(self):
+        self.compare("/complexapi/widgets/")
+        self.compare("/complexapi/widgets/?fields=name,archived_at&ordering=-cost")
+        self.compare("/complexapi/widgets/%s/" % Widget.objects.first().pk)
+
+    def test_missing_object(self):
+        response = self.client.get("/complexapi/widgets/0/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # A pk that isn't a number is just as missing
+        response = self.client.get("/publicapi/widgets/abc/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @isolate_apps("example.app.widgets")
+    @override_settings(MEDIA_URL="/media/")
+    def test_file_fields(self):
+        # Store's name column read as a file
+        class Logo(models.Model):
+            logo = models.FileField(db_column="name")
+
+            class Meta:
+                app_label = "widgets"
+                db_table = Store._meta.db_table
+                managed = False
+
+        api = EasyAPI(
+            "LogoAPI", permissions.AllowAny, permission_context=lambda r: True,
+            graphql=False,
+        )
+        self.addCleanup(all_apis.discard, api)
+        api.register(Logo)
+        resource = api.get_resource_for_model(Logo)
+        Store.objects.filter(name="fast").update(name="logos/fast.png")
+
+        # values() has the file's name, and its url needs the request
+        self.assertIsNone(resource.get_row_converter(resource.serializer_class))
+        view = resource.generate_viewset().as_view({"get": "list"})
+        response = view(APIRequestFactory().get("/logos/"))
+        self.assertIn(
+            "http://testserver/media/logos/fast.png",
+            [row["logo"] for row in response.data],
+        )
+
+
+class CompiledSerializerTest(APITestCase):
+    def setUp(self):
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.suser.groups.add(Group.objects.create(name="staff"))
+        store = Store.objects.create(owner=self.suser, name="compiled")
+        for color in ["red", "blue"]:
+            Widget.objects.create(color=color, size="small", shape="circle", store=store)
+        Widget.objects.filter(color="red").update(archived_at=timezone.now())
+
+    def assertSameOutput(self, compiled, model, **kwargs):
+        base = compiled.compiled_from
+        instances = list(model.objects.all())
+        self.assertTrue(instances)
+        self.assertEqual(
+            compiled(instances, many=True, **kwargs).data,
+            base(instances, many=True, **kwargs).data,
+        )
+
+    def test_registered_resources_are_compiled(self):
+        for model in [Widget, Store, User, Purchase]:
+            resource = privateapi.get_resource_for_model(model)
+            self.assertTrue(resource.compiled)
+            self.assertTrue(resource.serializer_class.compiled_from)
+
+        users = privateapi.get_resource_for_model(User)
+        self.assertSameOutput(users.serializer_class, User)
+        self.assertIn("source.groups.all()", users.serializer_class.compiled_function.source)
+
+        widgets = privateapi.get_resource_for_model(Widget)
+        self.assertSameOutput(widgets.serializer_class, Widget)
+        self.assertSameOutput(widgets.get_sparse_serializer(["store", "cost"]), Widget)
+
+    def test_fallback_fields(self):
+        class WidgetSerializer(serializers.ModelSerializer):
+            store_name = serializers.CharField(source="store.name")
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Widget
+                fields = ["pk", "name", "store", "store_name", "label"]
+
+            def get_label(self, widget):
+                return widget.name.upper()
+
+        compiled = compile_serializer_class(WidgetSerializer, Widget)
+        self.assertSameOutput(compiled, Widget)
+        self.assertIn("render_field(fields['label']", compiled.compiled_function.source)
+
+    def test_context_fields(self):
+        class PathField(serializers.CharField):
+            def to_representation(self, value):
+                return self.context["request"].path + value
+
+        class WidgetSerializer(serializers.ModelSerializer):
+            path = PathField(source="color")
+            logo = serializers.FileField(source="name")
+
+            class Meta:
+                model = Widget
+                fields = ["pk", "name", "path", "logo"]
+
+        # Both are rendered by the bound fields, which have the request
+        compiled = compile_serializer_class(WidgetSerializer, Widget)
+        request = APIRequestFactory().get("/widgets/")
+        self.assertSameOutput(compiled, Widget, context={"request": request})
+        self.assertIn("render_field(fields['path']", compiled.compiled_function.source)
+        self.assertIn("render_field(fields['logo']", compiled.compiled_function.source)
+        widget = Widget.objects.first()
+        data = compiled(widget, context={"request": request}).data
+        self.assertEqual(data["path"], "/widgets/" + widget.color)
+
+    def test_custom_to_representation_kept(self):
+        class WidgetSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Widget
+                fields = ["pk", "name"]
+
+            def to_representation(self, widget):
+                return {"custom": widget.name}
+
+        self.assertIs(compile_serializer_class(WidgetSerializer, Widget), WidgetSerializer)
+
+        resource = privateapi.get_resource_for_model(Widget)
+        serializer_class = resource.serializer_class
+        try:
+            resource.serializer_class = WidgetSerializer
+            resource.compile()
+            self.assertIs(resource.serializer_class, WidgetSerializer)
+            widget = Widget.objects.first()
+            self.assertEqual(
+                resource.serializer_class(widget).data, {"custom": widget.name}
+            )
+        finally:
+            resource.serializer_class = serializer_class
+
+
+class AggregateTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.suser = User.objects.create_superuser(
+            username=SUPER["username"], email=SUPER["email"], password=SUPER["password"]
+        )
+        self.client.login(username=SUPER["username"], password=SUPER["password"])
+        store = Store.objects.create(owner=self.suser, name="sums")
+        for state, prices in [("CA", [10, 20]), ("NY", [5])]:
+            customer = Customer.objects.create(store=store, state=state, age=40)
+            for i, price in enumerate(prices):
+                purchase = Purchase.objects.create(
+                    customer=customer,
+                    sale_date=datetime(2020, 1 + i * 3, 1, tzinfo=timezone.utc),
+                )
+                Purchase.objects.filter(pk=purchase.pk).update(sale_price=price)
+
+    def test_group_by_relation(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/complexapi/purchases/aggregate/"
+                "?group_by=customer__state&aggregate=sum:sale_price,count"
+                "&sale_price_greater_than=7"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        purchase_queries = [
+            q["sql"] for q in queries if '"widgets_purchase"' in q["sql"]
+        ]
+        self.assertEqual(len(purchase_queries), 1)
+        self.assertIn("GROUP BY", purchase_queries[0])
+
+        totals = {row["customer__state"]: row for row in response.data}
+        purchases = Purchase.objects.filter(customer__state__in=["CA", "NY"])
+        ca = purchases.filter(customer__state="CA")
+        self.assertEqual(totals["CA"]["sum_sale_price"], sum(p.sale_price for p in ca))
+        self.assertEqual(totals["CA"]["count"], ca.count())
+        # NY's only purchase is filtered out, so it has no group
+        self.assertNotIn("NY", totals)
+
+    def test_related_rows_scoped(self):
+        class CaliforniaCustomers(ModelResource):
+            name = "CaliforniaCustomerResource"
+
+            class Meta:
+                model = Customer
+
+            def get_default_queryset(self):
+                return Customer.objects.filter(state="CA")
+
+        api = EasyAPI(
+            "StateAPI", permissions.IsAdminUser, permission_context=lambda r: True
+        )
+        self.addCleanup(all_apis.discard, api)
+        api.register(CaliforniaCustomers)
+        api.register(Purchase)
+        resource = api.get_resource_for_model(Purchase)
+
+        qs, audit = resource.get_permitted_queryset("list", user=self.suser)
+        rows = aggregate(
+            resource, qs, group_by=["customer__state"], aggregates=["count"],
+            user=self.suser,
+        )
+        self.assertEqual(rows, [{"customer__state": "CA", "count": 2}])
+
+        # Without a related path every permitted row is counted
+        self.assertEqual(
+            aggregate(resource, qs, aggregates=["count"], user=self.suser),
+            [{"count": qs.count()}],
+        )
+
+    def test_date_buckets(self):
+        response = self.client.get(
+            "/complexapi/purchases/aggregate/"
+            "?group_by=sale_date:quarter&aggregate=max:sale_price"
+            "&sale_price_greater_than=7"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        quarters = [
+            (row["sale_date_quarter"].month, row["max_sale_price"])
+            for row in response.data
+            if row["sale_date_quarter"].year == 2020
+        ]
+        self.assertEqual(quarters, [(1, 10), (4, 20)])
+
+    def test_whole_queryset(self):
+        response = self.client.get(
+            "/complexapi/purchases/aggregate/?aggregate=avg:sale_price"
+        )
+        self.assertEqual(list(response.data[0].keys()), ["avg_sale_price"])
+
+    def test_invalid_specs(self):
+        for query in [
+            "group_by=nonsense",
+            "aggregate=sum:customer",
+            "aggregate=median:sale_price",
+            "group_by=sale_price:month",
+            "group_by=customer__store__nonsense",
+            "group_by=items__widget",
+        ]:
+            response = self.client.get("/complexapi/purchases/aggregate/?" + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+
+class SearchTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        store = Store.objects.create(owner=User.objects.first(), name="search")
+        for name in ["quick brown fox", "lazy dog", "brown bear", "quicksand"]:
+            Widget.objects.create(
+                name=name, color="red", size="small", shape="circle", store=store
+            )
+        self.resource = publicapi.get_resource_for_model(Widget)
+
+    def search(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/publicapi/widgets/?search=" + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["name"] for row in response.data], queries
+
+    def test_search(self):
+        self.assertIsInstance(self.resource.search_backend, SQLiteSearchBackend)
+        names, queries = self.search("brown")
+        self.assertEqual(set(names), {"quick brown fox", "brown bear"})
+        self.assertTrue(any("MATCH" in q["sql"] for q in queries))
+
+        # Words are prefixes and all have to match
+        names, queries = self.search("quick")
+        self.assertEqual(set(names), {"quick brown fox", "quicksand"})
+        names, queries = self.search("quick fox")
+        self.assertEqual(names, ["quick brown fox"])
+
+        # FTS5 syntax in the input is just text
+        names, queries = self.search('"brown* (')
+        self.assertEqual(set(names), {"quick brown fox", "brown bear"})
+
+    def test_index_follows_writes(self):
+        self.search("brown")
+        Widget.objects.filter(name="lazy dog").update(name="brown dog")
+        Widget.objects.filter(name="brown bear").delete()
+        names, queries = self.search("brown")
+        self.assertEqual(set(names), {"quick brown fox", "brown dog"})
+
+    def test_filters_and_ordering(self):
+        Widget.objects.filter(name="brown bear").update(color="blue")
+        names, queries = self.search("brown&color=blue")
+        self.assertEqual(names, ["brown bear"])
+
+        names, queries = self.search("brown&ordering=-name")
+        self.assertEqual(names, ["quick brown fox", "brown bear"])
+
+    def test_index_per_search_fields(self):
+        api = EasyAPI("SearchAPI", permissions.AllowAny, graphql=False)
+        self.addCleanup(all_apis.discard, api)
+        api.register(Widget, fields=["name", "shape"], search_fields=["shape"])
+        backend = api.get_resource_for_model(Widget).search_backend
+        self.assertEqual(api.search_backends, [backend])
+        self.assertNotEqual(backend.index, self.resource.search_backend.index)
+
+        # Unindexed searches fall back to icontains instead of creating it
+        with CaptureQueriesContext(connection) as queries:
+            qs = backend.search(Widget.objects.all(), "circ")
+            self.assertEqual(qs.count(), 4)
+        self.assertFalse(any("CREATE" in q["sql"] for q in queries))
+
+        self.assertEqual(backend.search(Widget.objects.all(), "brown").count(), 0)
+
+        # migrate created publicapi's index, which still searches its own fields
+        self.assertTrue(self.resource.search_backend.has_index(connection))
+        self.assertIn('"shape"', backend.get_schema(connection.ops.quote_name)[0])
+        names, queries = self.search("brown")
+        self.assertEqual(set(names), {"quick brown fox", "brown bear"})
+
+    def test_missing_trigger(self):
+        backend = self.resource.search_backend
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER %s" % quote(backend.index + "_ai"))
+        backend.indexed.discard(connection.alias)
+        self.addCleanup(backend.indexed.discard, connection.alias)
+
+        # A stale index isn't used, and writes it missed are found once repaired
+        Widget.objects.create(
+            name="brown owl", color="red", size="small", shape="circle",
+            store=Store.objects.get(name="search"),
+        )
+        self.assertFalse(backend.has_index(connection))
+        names, queries = self.search("brown")
+        self.assertEqual(set(names), {"quick brown fox", "brown bear", "brown owl"})
+        self.assertFalse(any("MATCH" in q["sql"] for q in queries))
+
+        with CaptureQueriesContext(connection) as queries:
+            backend.ensure_index(connection)
+        self.assertFalse(any("VIRTUAL" in q["sql"] for q in queries))
+        self.assertTrue(backend.has_index(connection))
+        names, queries = self.search("brown")
+        self.assertEqual(set(names), {"quick brown fox", "brown bear", "brown owl"})
+        self.assertTrue(any("MATCH" in q["sql"] for q in queries))
+
+    def test_non_integer_pk(self):
+        api = EasyAPI("SessionAPI", permissions.AllowAny, graphql=False)
+        self.addCleanup(all_apis.discard, api)
+        api.register(Session, search_fields=["session_key"])
+        resource = api.get_resource_for_model(Session)
+        self.assertIsInstance(resource.search_backend, ContainsSearchBackend)
+
+        # Chosen explicitly, the SQLite backend never indexes the table
+        backend = SQLiteSearchBackend(resource)
+        with CaptureQueriesContext(connection) as queries:
+            create_search_indexes(apis=[api])
+            self.assertFalse(backend.has_index(connection))
+        self.assertFalse(any("CREATE" in q["sql"] for q in queries))
+
+        Session.objects.create(
+            session_key="brownfox", session_data="", expire_date=timezone.now()
+        )
+        qs = backend.search(Session.objects.all(), "brown")
+        self.assertEqual([s.session_key for s in qs], ["brownfox"])
+
+    def test_contains_backend(self):
+        backend = ContainsSearchBackend(self.resource)
+        qs = backend.search(Widget.objects.all(), "BROWN fo")
+        self.assertEqual([w.name for w in qs], ["quick brown fox"])